@@ -4,9 +4,70 @@ Temporal awareness, pattern detection, and deeper insights
 """
 
 from typing import Dict, List, Any, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
+from bisect import bisect_right
 from collections import defaultdict, Counter
-import statistics
+import threading
+import weakref
+
+import numpy as np
+
+WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+_POSITIVE_MOODS = frozenset({"joy", "love", "excitement", "calm"})
+
+# Productivity scoring tables: points[bisect_right(breakpoints, value)]
+_STREAK_BREAKPOINTS, _STREAK_POINTS = (1, 3, 7), (0, 10, 20, 30)
+_VOLUME_BREAKPOINTS, _VOLUME_POINTS = (1, 3, 5, 7), (0, 10, 15, 25, 30)
+_PROJECT_BREAKPOINTS, _PROJECT_POINTS = (1, 2, 3), (5, 10, 15, 20)
+
+
+def _streak_lengths(ordinals: np.ndarray) -> Tuple[int, int]:
+    """
+    Compute (leading_streak, longest_streak) from descending day ordinals.
+
+    Operates on an int64 array so the scan is native integer arithmetic
+    instead of per-iteration timedelta objects.
+    """
+    n = len(ordinals)
+    if n == 0:
+        return 0, 0
+    if n == 1:
+        return 1, 1
+
+    # For short histories the vectorized path costs more than it saves -
+    # walk the ordinals directly
+    if n < 32:
+        leading = 1
+        longest = temp = 1
+        broken = False
+        for i in range(n - 1):
+            if ordinals[i] - ordinals[i + 1] == 1:
+                temp += 1
+                longest = max(longest, temp)
+                if not broken:
+                    leading += 1
+            else:
+                temp = 1
+                broken = True
+        return leading, longest
+
+    # diffs are -1 wherever two dates are consecutive days
+    consecutive = np.diff(ordinals) == -1
+
+    # Leading run of consecutive days (streak anchored at the newest date)
+    breaks = np.flatnonzero(~consecutive)
+    leading = int(breaks[0]) + 1 if len(breaks) else n
+
+    # Longest run anywhere: count consecutive True spans
+    if len(breaks) == 0:
+        longest = n
+    else:
+        run_ends = np.concatenate((breaks, [n - 1]))
+        run_starts = np.concatenate(([-1], breaks))
+        longest = int((run_ends - run_starts).max())
+
+    return leading, longest
 
 
 class DeepAnalytics:
@@ -15,84 +76,84 @@ class DeepAnalytics:
     def __init__(self, db):
         self.db = db
 
-    def get_writing_streak(self) -> Dict[str, Any]:
+        # Incrementally maintained mention stats per project, so repeated
+        # insight calls only query entries added since the last refresh
+        self._project_mention_counts: Dict[int, int] = defaultdict(int)
+        self._project_last_mention: Dict[int, str] = {}
+        self._mentions_high_water_entry_id = 0
+
+    def get_writing_streak(self, now: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Calculate current writing streak and longest streak
 
+        Args:
+            now: Reference time (default: datetime.now())
+
         Returns:
             Dict with current_streak, longest_streak, last_entry_date
         """
-        entries = self.db.get_recent_entries(limit=1000)
+        if now is None:
+            now = datetime.now()
 
-        if not entries:
+        # Only distinct dates matter for streaks - let SQLite dedupe and sort
+        dates = self.db.get_distinct_entry_dates(limit=1000)
+
+        if not dates:
             return {
                 "current_streak": 0,
                 "longest_streak": 0,
                 "last_entry_date": None,
-                "total_entries": 0
+                "total_entries": 0,
+                "entries_this_week": 0,
+                "entries_this_month": 0
             }
 
-        # Group entries by date
-        entries_by_date = defaultdict(list)
-        for entry in entries:
-            date = datetime.fromisoformat(entry["timestamp"]).date()
-            entries_by_date[date].append(entry)
-
-        # Sort dates
-        dates = sorted(entries_by_date.keys(), reverse=True)
-
-        # Calculate current streak
-        current_streak = 0
-        today = datetime.now().date()
-
-        # Check if there's an entry today or yesterday
-        if dates and (dates[0] == today or dates[0] == today - timedelta(days=1)):
-            check_date = dates[0]
-            for date in dates:
-                if date == check_date:
-                    current_streak += 1
-                    check_date = check_date - timedelta(days=1)
-                elif date < check_date - timedelta(days=1):
-                    break
-
-        # Calculate longest streak
-        longest_streak = 0
-        temp_streak = 1
-
-        for i in range(len(dates) - 1):
-            if dates[i] - dates[i + 1] == timedelta(days=1):
-                temp_streak += 1
-                longest_streak = max(longest_streak, temp_streak)
-            else:
-                temp_streak = 1
+        # Both streak scans run on int64 day ordinals (dates are distinct
+        # and sorted descending)
+        ordinals = np.fromiter(
+            (date.fromisoformat(d).toordinal() for d in dates),
+            dtype=np.int64,
+            count=len(dates)
+        )
 
-        longest_streak = max(longest_streak, temp_streak)
+        leading_streak, longest_streak = _streak_lengths(ordinals)
+
+        # Current streak only counts if it starts today or yesterday
+        today_ordinal = now.date().toordinal()
+        current_streak = leading_streak if ordinals[0] in (today_ordinal, today_ordinal - 1) else 0
 
         return {
             "current_streak": current_streak,
             "longest_streak": longest_streak,
-            "last_entry_date": dates[0].isoformat() if dates else None,
-            "total_entries": len(entries),
-            "entries_this_week": sum(1 for d in dates if d >= today - timedelta(days=7)),
-            "entries_this_month": sum(1 for d in dates if d >= today - timedelta(days=30))
+            "last_entry_date": dates[0],
+            "total_entries": self.db.count_entries(),
+            "entries_this_week": self.db.count_entries(since=now - timedelta(days=7)),
+            "entries_this_month": self.db.count_entries(since=now - timedelta(days=30))
         }
 
-    def analyze_temporal_mood_patterns(self, days: int = 30) -> Dict[str, Any]:
+    def analyze_temporal_mood_patterns(self, days: int = 30, now: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Analyze how moods change over time
 
         Args:
             days: Number of days to analyze
+            now: Reference time (default: datetime.now())
 
         Returns:
             Mood patterns and trends
         """
-        cutoff = datetime.now() - timedelta(days=days)
+        if now is None:
+            now = datetime.now()
+
         timeline = self.db.get_mood_timeline(days=days)
 
         if not timeline:
             return {"patterns": [], "trends": {}}
 
+        # Parse every timeline date once into a datetime64 array; the weekly
+        # and dominant-emotion passes below reuse it instead of re-parsing
+        dates64 = np.array([e["date"][:10] for e in timeline], dtype="datetime64[D]")
+
         # Group by emotion
         emotions_over_time = defaultdict(list)
         for entry in timeline:
@@ -105,11 +166,17 @@ class DeepAnalytics:
         trends = {}
         for emotion, data_points in emotions_over_time.items():
             if len(data_points) >= 2:
-                scores = [d["score"] for d in sorted(data_points, key=lambda x: x["date"])]
+                dates = np.array([d["date"] for d in data_points])
+                scores = np.fromiter(
+                    (d["score"] for d in data_points),
+                    dtype=np.float64,
+                    count=len(data_points)
+                )[np.argsort(dates, kind="stable")]
+
                 # Simple trend: compare first half to second half
                 mid = len(scores) // 2
-                first_half_avg = statistics.mean(scores[:mid])
-                second_half_avg = statistics.mean(scores[mid:])
+                first_half_avg = scores[:mid].mean()
+                second_half_avg = scores[mid:].mean()
 
                 if second_half_avg > first_half_avg * 1.1:
                     trends[emotion] = "increasing"
@@ -122,57 +189,87 @@ class DeepAnalytics:
         patterns = []
 
         # Weekly patterns
-        weekly_moods = self._analyze_weekly_patterns(timeline)
+        weekly_moods = self._analyze_weekly_patterns(timeline, dates64=dates64)
         if weekly_moods:
             patterns.append({
                 "type": "weekly",
                 "description": weekly_moods
             })
 
+        dominant = self._get_dominant_emotions(timeline, periods=(7, 30), now=now, dates64=dates64)
+
         return {
             "trends": trends,
             "patterns": patterns,
-            "dominant_emotion_last_week": self._get_dominant_emotion_period(timeline, 7),
-            "dominant_emotion_last_month": self._get_dominant_emotion_period(timeline, 30)
+            "dominant_emotion_last_week": dominant[7],
+            "dominant_emotion_last_month": dominant[30]
         }
 
-    def _analyze_weekly_patterns(self, timeline: List[Dict]) -> Optional[str]:
+    def _analyze_weekly_patterns(
+        self,
+        timeline: List[Dict],
+        dates64: Optional[np.ndarray] = None
+    ) -> Optional[str]:
         """Analyze if there are weekly mood patterns"""
-        # Group by day of week
-        day_emotions = defaultdict(lambda: defaultdict(list))
+        if dates64 is None:
+            dates64 = np.array([e["date"][:10] for e in timeline], dtype="datetime64[D]")
 
-        for entry in timeline:
-            date = datetime.fromisoformat(entry["date"])
-            day_of_week = date.strftime("%A")
-            day_emotions[day_of_week][entry["emotion"]].append(entry["avg_score"])
+        # Weekday per row, vectorized (epoch day 0 was a Thursday)
+        weekdays = (dates64.view("int64") + 3) % 7
+
+        # Group by day of week, accumulating (sum, count) instead of score lists
+        day_emotions = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+
+        for entry, weekday in zip(timeline, weekdays):
+            acc = day_emotions[WEEKDAY_NAMES[weekday]][entry["emotion"]]
+            acc[0] += entry["avg_score"]
+            acc[1] += 1
 
         # Find if any day has consistently different mood
         insights = []
         for day, emotions in day_emotions.items():
-            for emotion, scores in emotions.items():
-                if len(scores) >= 2 and statistics.mean(scores) > 0.6:
+            for emotion, (score_sum, count) in emotions.items():
+                if count >= 2 and score_sum / count > 0.6:
                     insights.append(f"Higher {emotion} on {day}s")
 
         return "; ".join(insights) if insights else None
 
-    def _get_dominant_emotion_period(self, timeline: List[Dict], days: int) -> Optional[str]:
-        """Get dominant emotion for a specific period"""
-        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
-        recent = [e for e in timeline if e["date"] >= cutoff]
-
-        if not recent:
-            return None
+    def _get_dominant_emotions(
+        self,
+        timeline: List[Dict],
+        periods: Tuple[int, ...] = (7, 30),
+        now: Optional[datetime] = None,
+        dates64: Optional[np.ndarray] = None
+    ) -> Dict[int, Optional[str]]:
+        """Get dominant emotion per lookback period in a single timeline pass"""
+        if dates64 is None:
+            dates64 = np.array([e["date"][:10] for e in timeline], dtype="datetime64[D]")
+
+        today = (now or datetime.now()).date()
+        # One vectorized comparison per period instead of per-row string compares
+        in_period = {
+            days: dates64 >= np.datetime64((today - timedelta(days=days)).isoformat())
+            for days in periods
+        }
+        totals = {days: defaultdict(float) for days in periods}
 
-        emotion_totals = defaultdict(float)
-        for entry in recent:
-            emotion_totals[entry["emotion"]] += entry["avg_score"]
+        for i, entry in enumerate(timeline):
+            score = entry["avg_score"]
+            emotion = entry["emotion"]
+            for days, mask in in_period.items():
+                if mask[i]:
+                    totals[days][emotion] += score
 
-        if emotion_totals:
-            return max(emotion_totals.items(), key=lambda x: x[1])[0]
-        return None
+        return {
+            days: max(emotion_totals, key=emotion_totals.__getitem__) if emotion_totals else None
+            for days, emotion_totals in totals.items()
+        }
 
-    def get_project_insights(self) -> Dict[str, Any]:
+    def get_project_insights(self, now: Optional[datetime] = None) -> Dict[str, Any]:
         """Analyze project engagement over time"""
+        if now is None:
+            now = datetime.now()
+
         projects = self.db.get_active_projects()
 
         insights = {
@@ -181,30 +278,22 @@ class DeepAnalytics:
             "recommendations": []
         }
 
+        if not projects:
+            return insights
+
+        self._refresh_project_mention_cache()
+
         for project in projects:
-            # Get all mentions of this project
-            project_id = project["id"]
-
-            with self.db.get_connection() as conn:
-                mentions = conn.execute(
-                    """
-                    SELECT e.timestamp, pm.mention_type
-                    FROM project_mentions pm
-                    JOIN entries e ON pm.entry_id = e.id
-                    WHERE pm.project_id = ?
-                    ORDER BY e.timestamp DESC
-                    LIMIT 100
-                    """,
-                    (project_id,)
-                ).fetchall()
-
-            if mentions:
-                last_mention = datetime.fromisoformat(mentions[0]["timestamp"])
-                days_since = (datetime.now() - last_mention).days
+            total_mentions = self._project_mention_counts.get(project["id"], 0)
+
+            if total_mentions:
+                last_ts = self._project_last_mention[project["id"]]
+                last_mention = datetime.fromisoformat(last_ts)
+                days_since = (now - last_mention).days
 
                 project_data = {
                     "name": project["name"],
-                    "total_mentions": len(mentions),
+                    "total_mentions": total_mentions,
                     "days_since_last_mention": days_since,
                     "status": "active" if days_since < 7 else "stale" if days_since < 30 else "dormant"
                 }
@@ -219,61 +308,122 @@ class DeepAnalytics:
 
         return insights
 
-    def get_creative_productivity_score(self) -> Dict[str, Any]:
+    def invalidate_project_mentions(self):
+        """
+        Reset the incremental mention cache
+
+        Must be called when entries are edited or deleted: their mentions
+        change below the high-water mark, where the incremental refresh
+        never looks again.
+        """
+        self._project_mention_counts.clear()
+        self._project_last_mention.clear()
+        self._mentions_high_water_entry_id = 0
+
+    def _refresh_project_mention_cache(self):
+        """
+        Fold mentions from entries newer than the high-water mark into the
+        per-project stats cache. After warmup each call is O(new entries)
+        rather than O(all mentions). Entry edits and deletions must go
+        through invalidate_project_mentions - they mutate mentions at or
+        below the watermark.
+        """
+        with self.db.get_connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT pm.project_id, pm.entry_id, e.timestamp
+                FROM project_mentions pm
+                JOIN entries e ON pm.entry_id = e.id
+                WHERE pm.entry_id > ?
+                """,
+                (self._mentions_high_water_entry_id,)
+            ).fetchall()
+
+        for row in rows:
+            project_id = row["project_id"]
+            timestamp = row["timestamp"]
+
+            self._project_mention_counts[project_id] += 1
+
+            last = self._project_last_mention.get(project_id)
+            if last is None or timestamp > last:
+                self._project_last_mention[project_id] = timestamp
+
+            if row["entry_id"] > self._mentions_high_water_entry_id:
+                self._mentions_high_water_entry_id = row["entry_id"]
+
+    def _count_active_projects(self, now: Optional[datetime] = None) -> int:
+        """Count projects mentioned in the last 7 days with one query"""
+        cutoff = (now or datetime.now()) - timedelta(days=7)
+
+        with self.db.get_connection() as conn:
+            row = conn.execute(
+                """
+                SELECT COUNT(DISTINCT pm.project_id) AS n
+                FROM project_mentions pm
+                JOIN entries e ON pm.entry_id = e.id
+                WHERE e.timestamp >= ?
+                """,
+                (cutoff,)
+            ).fetchone()
+
+            return row["n"]
+
+    def get_creative_productivity_score(
+        self,
+        streak: Optional[Dict[str, Any]] = None,
+        mood_analysis: Optional[Dict[str, Any]] = None,
+        project_insights: Optional[Dict[str, Any]] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """
         Calculate a creativity/productivity score based on various factors
 
+        Args:
+            streak: Precomputed get_writing_streak() result (avoids re-querying)
+            mood_analysis: Precomputed analyze_temporal_mood_patterns() result
+            project_insights: Precomputed get_project_insights() result
+            now: Reference time (default: datetime.now())
+
         Returns:
             Score (0-100) and contributing factors
         """
-        streak = self.get_writing_streak()
-        mood_analysis = self.analyze_temporal_mood_patterns(days=7)
+        if now is None:
+            now = datetime.now()
+        if streak is None:
+            streak = self.get_writing_streak(now=now)
+        if mood_analysis is None:
+            mood_analysis = self.analyze_temporal_mood_patterns(days=7, now=now)
 
         # Factors
         factors = {}
 
         # Consistency factor (0-30 points)
-        if streak["current_streak"] >= 7:
-            factors["consistency"] = 30
-        elif streak["current_streak"] >= 3:
-            factors["consistency"] = 20
-        elif streak["current_streak"] >= 1:
-            factors["consistency"] = 10
-        else:
-            factors["consistency"] = 0
+        factors["consistency"] = _STREAK_POINTS[
+            bisect_right(_STREAK_BREAKPOINTS, streak["current_streak"])
+        ]
 
         # Volume factor (0-30 points)
-        week_entries = streak["entries_this_week"]
-        if week_entries >= 7:
-            factors["volume"] = 30
-        elif week_entries >= 5:
-            factors["volume"] = 25
-        elif week_entries >= 3:
-            factors["volume"] = 15
-        elif week_entries >= 1:
-            factors["volume"] = 10
-        else:
-            factors["volume"] = 0
+        factors["volume"] = _VOLUME_POINTS[
+            bisect_right(_VOLUME_BREAKPOINTS, streak["entries_this_week"])
+        ]
 
         # Mood factor (0-20 points) - positive moods boost score
-        positive_moods = ["joy", "love", "excitement", "calm"]
         dominant = mood_analysis.get("dominant_emotion_last_week")
-        if dominant in positive_moods:
+        if dominant in _POSITIVE_MOODS:
             factors["mood"] = 20
         else:
             factors["mood"] = 10
 
-        # Project engagement (0-20 points)
-        project_insights = self.get_project_insights()
-        active_count = sum(1 for p in project_insights["projects"] if p["status"] == "active")
-        if active_count >= 3:
-            factors["projects"] = 20
-        elif active_count >= 2:
-            factors["projects"] = 15
-        elif active_count >= 1:
-            factors["projects"] = 10
+        # Project engagement (0-20 points) - when no precomputed insights are
+        # available, a single COUNT query beats building the full report
+        if project_insights is None:
+            active_count = self._count_active_projects(now=now)
         else:
-            factors["projects"] = 5
+            active_count = sum(1 for p in project_insights["projects"] if p["status"] == "active")
+        factors["projects"] = _PROJECT_POINTS[
+            bisect_right(_PROJECT_BREAKPOINTS, active_count)
+        ]
 
         total_score = sum(factors.values())
 
@@ -299,21 +449,42 @@ class DeepAnalytics:
 
     def get_comprehensive_insights(self) -> Dict[str, Any]:
         """Get all insights in one call"""
+        # Compute each sub-analysis once with a consistent reference time and
+        # share the results with the scoring pass
+        now = datetime.now()
+        streak = self.get_writing_streak(now=now)
+        mood_patterns = self.analyze_temporal_mood_patterns(now=now)
+        project_insights = self.get_project_insights(now=now)
+
         return {
-            "streak": self.get_writing_streak(),
-            "mood_patterns": self.analyze_temporal_mood_patterns(),
-            "project_insights": self.get_project_insights(),
-            "productivity_score": self.get_creative_productivity_score()
+            "streak": streak,
+            "mood_patterns": mood_patterns,
+            "project_insights": project_insights,
+            "productivity_score": self.get_creative_productivity_score(
+                streak=streak,
+                mood_analysis=mood_patterns,
+                project_insights=project_insights,
+                now=now
+            )
         }
 
 
-# Singleton
-_analytics_instance: Optional[DeepAnalytics] = None
+# Singletons, one per database instance. Values are weakly held: when the
+# app drops an instance (each unlock builds a fresh database + analytics),
+# the old pair is garbage collected instead of accumulating here. A weakly
+# keyed map would never collect - the instance's own db reference keeps
+# the key alive; that same reference also means the id() key can't be
+# reused while its entry exists.
+_analytics_instances: "weakref.WeakValueDictionary[int, DeepAnalytics]" = weakref.WeakValueDictionary()
+_analytics_lock = threading.Lock()
 
 
 def get_analytics(db) -> DeepAnalytics:
-    """Get or create analytics instance"""
-    global _analytics_instance
-    if _analytics_instance is None:
-        _analytics_instance = DeepAnalytics(db)
-    return _analytics_instance
+    """Get or create the analytics instance for this database"""
+    key = id(db)
+    with _analytics_lock:
+        instance = _analytics_instances.get(key)
+        if instance is None:
+            instance = DeepAnalytics(db)
+            _analytics_instances[key] = instance
+    return instance
@@ -11,8 +11,10 @@ from pathlib import Path
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 import json
+import threading
 from contextlib import contextmanager
 import hashlib
+import hmac
 
 # Try to import SQLCipher for encrypted database
 try:
@@ -54,43 +56,147 @@ class DiaryDatabase:
         self.db_path = db_path
         self.password = password
         self._password_hash = self._hash_password(password) if password else None
-        self._connection: Optional[sqlite3.Connection] = None
         self.is_encrypted = HAS_ENCRYPTION
 
+        # One long-lived connection per thread - reopening (and re-keying,
+        # which runs SQLCipher's KDF) on every call dominates short queries
+        self._tls = threading.local()
+        self._all_connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        # SQLite allows one writer at a time - serialize writers in-process
+        # (cheaper than SQLITE_BUSY backoff); WAL readers proceed unlocked
+        self._write_lock = threading.RLock()
+
+        # Daily background maintenance (see _schedule_maintenance)
+        self._maintenance_timer: Optional[threading.Timer] = None
+
+        # Set during initialize_schema; False when this build lacks FTS5
+        self._has_fts = False
+
+        # Cached verify_password result - one hash + one query per instance
+        self._password_verified: Optional[bool] = None
+
+        # Decoded user preferences, write-through on set_user_preference
+        self._pref_cache: Dict[str, Any] = {}
+
+        # search_entries SQL keyed by filter shape
+        self._search_sql_cache: Dict[Tuple, str] = {}
+
     def _hash_password(self, password: str) -> str:
-        """Hash password for storage/verification"""
+        """Hash password for storage/verification (PBKDF2, computed once)"""
+        return hashlib.pbkdf2_hmac(
+            "sha256", password.encode(), b"diaryml-auth-v1", 200_000
+        ).hex()
+
+    def _legacy_hash_password(self, password: str) -> str:
+        """Plain SHA-256 hash used by databases created before PBKDF2"""
         return hashlib.sha256(password.encode()).hexdigest()
 
-    @contextmanager
-    def get_connection(self):
-        """Get database connection with encryption"""
-        conn = sqlite3.connect(str(self.db_path))
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open and configure a new connection (runs once per thread)"""
+        # A generous statement cache plus the per-thread connection reuse
+        # means hot SQL is prepared once and stepped from cache thereafter
+        conn = sqlite3.connect(
+            str(self.db_path),
+            check_same_thread=False,
+            cached_statements=256
+        )
 
         # CRITICAL: Set encryption key FIRST (before any other operations)
         if HAS_ENCRYPTION and self.password:
-            # Use the password directly as the encryption key
-            conn.execute(f"PRAGMA key = '{self.password}'")
+            # Use the password directly as the encryption key. PRAGMAs can't
+            # take bound parameters, so escape quotes the SQL way - a
+            # password containing ' must not break (or worse, truncate) the
+            # key statement.
+            escaped = self.password.replace("'", "''")
+            conn.execute(f"PRAGMA key = '{escaped}'")
             # Set SQLCipher compatibility for better performance
             conn.execute("PRAGMA cipher_compatibility = 4")
 
+        # Reclaim freed pages incrementally instead of full VACUUMs. Must be
+        # set before the first page is written; a no-op on existing files.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
         # Use WAL mode for better concurrency
-        conn.execute("PRAGMA journal_mode = WAL")
+        journal_mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        if journal_mode != "wal":
+            print(f"⚠ WARNING: WAL mode unavailable (got '{journal_mode}') - expect slower writes")
+
+        # Performance bundle: fewer fsyncs per commit, in-memory temp
+        # B-trees, a 20 MB page cache and mmap'd reads. foreign_keys makes
+        # the ON DELETE CASCADE clauses in the schema actually enforce.
+        conn.executescript("""
+            PRAGMA synchronous = NORMAL;
+            PRAGMA temp_store = MEMORY;
+            PRAGMA cache_size = -20000;
+            PRAGMA mmap_size = 268435456;
+            PRAGMA foreign_keys = ON;
+            PRAGMA wal_autocheckpoint = 1000;
+        """)
 
         # Return rows as dictionaries
         conn.row_factory = sqlite3.Row
 
-        try:
+        return conn
+
+    @contextmanager
+    def get_connection(self, write: bool = True):
+        """
+        Get this thread's cached connection, committing on success
+
+        Args:
+            write: Pass False for read-only work to skip the writer lock
+                   (WAL readers never block each other)
+        """
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = self._tls.conn = self._create_connection()
+            with self._connections_lock:
+                self._all_connections.append(conn)
+
+        if not write:
             yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+            return
+
+        with self._write_lock:
+            try:
+                yield conn
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+
+    def close(self):
+        """Close all cached connections (e.g. on shutdown or lock)"""
+        if self._maintenance_timer is not None:
+            self._maintenance_timer.cancel()
+            self._maintenance_timer = None
+
+        with self._connections_lock:
+            connections = self._all_connections
+            self._all_connections = []
+
+        for conn in connections:
+            try:
+                # Refresh planner statistics while we still can
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except Exception:
+                pass
+
+        self._tls = threading.local()
 
     def initialize_schema(self):
         """Create database schema and store password hash"""
         with self.get_connection() as conn:
+            # Databases created before incremental autovacuum need a
+            # one-time VACUUM to convert - without it the INCREMENTAL
+            # pragma is a no-op and freed pages are never reclaimed
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0:
+                print("Converting database to incremental autovacuum (one-time)...")
+                conn.execute("VACUUM")
+
             # Password verification table
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS auth (
@@ -195,11 +301,171 @@ class DiaryDatabase:
                 )
             """)
 
+            # Full-text index over entry content (FTS5 may be missing from
+            # some SQLCipher builds - search falls back to LIKE then)
+            self._has_fts = self._initialize_fts(conn)
+
+            # Daily mood rollup, maintained by triggers so the timeline
+            # query never joins/aggregates the full history
+            self._initialize_mood_rollup(conn)
+
             # Create indexes
             conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries(timestamp)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_moods_entry ON moods(entry_id)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages(session_id)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_name ON projects(name)")
+            # Covering index: emotion filters and mood hydration are served
+            # from the index without touching the moods table
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_moods_entry_emotion ON moods(entry_id, emotion, score)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_media_mentions_entry ON media_mentions(entry_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_session_time ON chat_messages(session_id, timestamp)")
+            # Partial index: get_active_projects becomes a reverse index
+            # range scan with no filter or sort step
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_projects_active_lastmention "
+                "ON projects(last_mentioned DESC) WHERE status = 'active'"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_media_type_id ON media_mentions(media_type, id DESC)")
+
+            # Seed planner statistics so joins over entries/moods get
+            # ANALYZE-driven plans from the start
+            conn.execute("PRAGMA optimize = 0x10002")
+
+        # Reclaim freed pages once a day in the background
+        if self._maintenance_timer is None:
+            self._schedule_maintenance()
+
+    def _initialize_fts(self, conn) -> bool:
+        """Create the FTS5 index over entries.content, backfilling once"""
+        try:
+            existed = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='entries_fts'"
+            ).fetchone() is not None
+
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                    content,
+                    content='entries',
+                    content_rowid='id',
+                    tokenize='porter unicode61'
+                )
+            """)
+
+            # Keep the index in sync with entries
+            conn.executescript("""
+                CREATE TRIGGER IF NOT EXISTS entries_fts_ai AFTER INSERT ON entries BEGIN
+                    INSERT INTO entries_fts(rowid, content) VALUES (new.id, new.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_fts_ad AFTER DELETE ON entries BEGIN
+                    INSERT INTO entries_fts(entries_fts, rowid, content)
+                    VALUES ('delete', old.id, old.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_fts_au AFTER UPDATE OF content ON entries BEGIN
+                    INSERT INTO entries_fts(entries_fts, rowid, content)
+                    VALUES ('delete', old.id, old.content);
+                    INSERT INTO entries_fts(rowid, content) VALUES (new.id, new.content);
+                END;
+            """)
+
+            # Index pre-existing entries the first time the table is created
+            if not existed:
+                conn.execute("INSERT INTO entries_fts(entries_fts) VALUES ('rebuild')")
+
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _initialize_mood_rollup(self, conn):
+        """Create the mood_daily rollup table, its sync triggers and backfill"""
+        existed = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='mood_daily'"
+        ).fetchone() is not None
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS mood_daily (
+                date TEXT NOT NULL,
+                emotion TEXT NOT NULL,
+                total REAL NOT NULL,
+                cnt INTEGER NOT NULL,
+                PRIMARY KEY (date, emotion)
+            )
+        """)
+
+        # Mood inserts fold into the rollup; entry deletes subtract their
+        # moods before the cascade removes them. (Direct mood deletes with a
+        # surviving entry are handled by the moods trigger - after a cascade
+        # the entry lookup is NULL and matches nothing, so no double count.)
+        conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS mood_daily_ai AFTER INSERT ON moods BEGIN
+                INSERT INTO mood_daily (date, emotion, total, cnt)
+                VALUES (
+                    (SELECT DATE(timestamp) FROM entries WHERE id = NEW.entry_id),
+                    NEW.emotion, NEW.score, 1
+                )
+                ON CONFLICT(date, emotion) DO UPDATE SET
+                    total = total + NEW.score,
+                    cnt = cnt + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS mood_daily_ad AFTER DELETE ON moods BEGIN
+                UPDATE mood_daily SET
+                    total = total - OLD.score,
+                    cnt = cnt - 1
+                WHERE date = (SELECT DATE(timestamp) FROM entries WHERE id = OLD.entry_id)
+                  AND emotion = OLD.emotion;
+                DELETE FROM mood_daily WHERE cnt <= 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS mood_daily_entry_au AFTER UPDATE OF timestamp ON entries
+            WHEN DATE(OLD.timestamp) != DATE(NEW.timestamp) BEGIN
+                UPDATE mood_daily SET
+                    total = total - COALESCE((
+                        SELECT SUM(score) FROM moods
+                        WHERE entry_id = OLD.id AND emotion = mood_daily.emotion
+                    ), 0),
+                    cnt = cnt - (
+                        SELECT COUNT(*) FROM moods
+                        WHERE entry_id = OLD.id AND emotion = mood_daily.emotion
+                    )
+                WHERE date = DATE(OLD.timestamp)
+                  AND emotion IN (SELECT emotion FROM moods WHERE entry_id = OLD.id);
+                DELETE FROM mood_daily WHERE cnt <= 0;
+                INSERT INTO mood_daily (date, emotion, total, cnt)
+                SELECT DATE(NEW.timestamp), emotion, SUM(score), COUNT(*)
+                FROM moods WHERE entry_id = NEW.id GROUP BY emotion
+                ON CONFLICT(date, emotion) DO UPDATE SET
+                    total = total + excluded.total,
+                    cnt = cnt + excluded.cnt;
+            END;
+            CREATE TRIGGER IF NOT EXISTS mood_daily_entry_bd BEFORE DELETE ON entries BEGIN
+                UPDATE mood_daily SET
+                    total = total - COALESCE((
+                        SELECT SUM(score) FROM moods
+                        WHERE entry_id = OLD.id AND emotion = mood_daily.emotion
+                    ), 0),
+                    cnt = cnt - (
+                        SELECT COUNT(*) FROM moods
+                        WHERE entry_id = OLD.id AND emotion = mood_daily.emotion
+                    )
+                WHERE date = DATE(OLD.timestamp)
+                  AND emotion IN (SELECT emotion FROM moods WHERE entry_id = OLD.id);
+                DELETE FROM mood_daily WHERE cnt <= 0;
+            END;
+        """)
+
+        # Fold pre-existing history in the first time the table is created
+        if not existed:
+            conn.execute("""
+                INSERT INTO mood_daily (date, emotion, total, cnt)
+                SELECT DATE(e.timestamp), m.emotion, SUM(m.score), COUNT(*)
+                FROM entries e
+                JOIN moods m ON e.id = m.entry_id
+                GROUP BY DATE(e.timestamp), m.emotion
+            """)
+
+    @staticmethod
+    def _fts_match_expression(query: str) -> str:
+        """Turn free text into a safe FTS5 MATCH expression (quoted terms)"""
+        terms = [t.replace('"', '') for t in query.split()]
+        return ' '.join(f'"{t}"' for t in terms if t)
 
     def add_entry(
         self,
@@ -223,18 +489,89 @@ class DiaryDatabase:
             )
             return cursor.lastrowid
 
-    def add_mood(self, entry_id: int, emotions: Dict[str, float]):
-        """Add emotion scores for an entry"""
+    def save_entry_atomic(
+        self,
+        content: str,
+        emotions: Optional[Dict[str, float]] = None,
+        projects: Optional[List[Dict[str, str]]] = None,
+        media: Optional[List[Dict[str, str]]] = None,
+        image_path: Optional[str] = None,
+        timestamp: Optional[datetime] = None
+    ) -> int:
+        """
+        Save an entry with its moods, project links and media mentions in
+        one transaction (one fsync instead of one per related write)
+
+        Args:
+            content: Entry text
+            emotions: {emotion: score} as produced by the emotion detector
+            projects: [{"name": ..., "type": ...}] from the pattern analyzer
+            media: [{"type": ..., "title": ...}] from the pattern analyzer
+            image_path: Optional attached image path
+            timestamp: Entry timestamp (default: now)
+
+        Returns:
+            entry_id
+        """
+        if timestamp is None:
+            timestamp = datetime.now()
+
         with self.get_connection() as conn:
-            for emotion, score in emotions.items():
-                conn.execute(
+            cursor = conn.execute(
+                "INSERT INTO entries (content, image_path, timestamp) VALUES (?, ?, ?)",
+                (content, image_path, timestamp)
+            )
+            entry_id = cursor.lastrowid
+
+            if emotions:
+                conn.executemany(
                     "INSERT INTO moods (entry_id, emotion, score) VALUES (?, ?, ?)",
-                    (entry_id, emotion, score)
+                    [(entry_id, emotion, score) for emotion, score in emotions.items()]
                 )
 
+            now = datetime.now()
+            for project in projects or []:
+                conn.execute(
+                    """
+                    INSERT INTO projects (name, first_mentioned, last_mentioned, status)
+                    VALUES (?, ?, ?, 'active')
+                    ON CONFLICT(name) DO UPDATE SET
+                        last_mentioned = ?,
+                        status = 'active'
+                    """,
+                    (project["name"], now, now, now)
+                )
+                # lastrowid is unreliable after ON CONFLICT - look the id up
+                project_id = conn.execute(
+                    "SELECT id FROM projects WHERE name = ?", (project["name"],)
+                ).fetchone()["id"]
+                conn.execute(
+                    "INSERT INTO project_mentions (entry_id, project_id, mention_type) VALUES (?, ?, ?)",
+                    (entry_id, project_id, project.get("type", "mention"))
+                )
+
+            if media:
+                conn.executemany(
+                    "INSERT INTO media_mentions (entry_id, media_type, title, sentiment) VALUES (?, ?, ?, ?)",
+                    [
+                        (entry_id, item["type"], item["title"], item.get("sentiment", "neutral"))
+                        for item in media
+                    ]
+                )
+
+            return entry_id
+
+    def add_mood(self, entry_id: int, emotions: Dict[str, float]):
+        """Add emotion scores for an entry"""
+        with self.get_connection() as conn:
+            conn.executemany(
+                "INSERT INTO moods (entry_id, emotion, score) VALUES (?, ?, ?)",
+                [(entry_id, emotion, score) for emotion, score in emotions.items()]
+            )
+
     def get_entry(self, entry_id: int) -> Optional[Dict[str, Any]]:
         """Get entry by ID with moods"""
-        with self.get_connection() as conn:
+        with self.get_connection(write=False) as conn:
             # Get entry
             entry = conn.execute(
                 "SELECT * FROM entries WHERE id = ?",
@@ -256,35 +593,73 @@ class DiaryDatabase:
 
             return entry_dict
 
-    def get_recent_entries(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent entries"""
-        with self.get_connection() as conn:
-            entries = conn.execute(
-                "SELECT * FROM entries ORDER BY timestamp DESC LIMIT ?",
+    def get_distinct_entry_dates(self, limit: int = 1000) -> List[str]:
+        """Get distinct entry dates (YYYY-MM-DD strings), most recent first"""
+        with self.get_connection(write=False) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT date(timestamp) AS d FROM entries ORDER BY d DESC LIMIT ?",
                 (limit,)
             ).fetchall()
 
-            result = []
-            for entry in entries:
-                entry_dict = dict(entry)
+            return [row["d"] for row in rows]
 
-                # Get moods
-                moods = conn.execute(
-                    "SELECT emotion, score FROM moods WHERE entry_id = ?",
-                    (entry_dict["id"],)
-                ).fetchall()
+    def count_entries(self, since: Optional[datetime] = None) -> int:
+        """Count entries, optionally only those at or after a cutoff"""
+        with self.get_connection(write=False) as conn:
+            if since:
+                row = conn.execute(
+                    "SELECT COUNT(*) AS n FROM entries WHERE timestamp >= ?",
+                    (since,)
+                ).fetchone()
+            else:
+                row = conn.execute("SELECT COUNT(*) AS n FROM entries").fetchone()
+            return row["n"]
 
-                entry_dict["moods"] = {row["emotion"]: row["score"] for row in moods}
+    def _fetch_entries_with_moods(self, conn, entry_sql: str, params) -> List[Dict[str, Any]]:
+        """
+        Run an entry-selecting query and hydrate moods in the same statement
+
+        One LEFT JOIN replaces the per-entry mood SELECT (N+1 pattern).
+        """
+        rows = conn.execute(
+            f"""
+            SELECT e.*, m.emotion, m.score
+            FROM ({entry_sql}) e
+            LEFT JOIN moods m ON m.entry_id = e.id
+            ORDER BY e.timestamp DESC
+            """,
+            params
+        ).fetchall()
+
+        result = []
+        entries_by_id = {}
+        for row in rows:
+            entry_dict = entries_by_id.get(row["id"])
+            if entry_dict is None:
+                entry_dict = dict(row)
+                del entry_dict["emotion"], entry_dict["score"]
+                entry_dict["moods"] = {}
+                entries_by_id[row["id"]] = entry_dict
                 result.append(entry_dict)
 
-            return result
+            if row["emotion"] is not None:
+                entry_dict["moods"][row["emotion"]] = row["score"]
+
+        return result
+
+    def get_recent_entries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get recent entries"""
+        with self.get_connection(write=False) as conn:
+            return self._fetch_entries_with_moods(
+                conn,
+                "SELECT * FROM entries ORDER BY timestamp DESC LIMIT ?",
+                (limit,)
+            )
 
     def delete_entry(self, entry_id: int):
         """Delete an entry (cascades to moods, projects, etc.)"""
         with self.get_connection() as conn:
             conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
-            # Reclaim disk space
-            conn.execute("VACUUM")
 
     def update_entry(self, entry_id: int, content: str, timestamp: Optional[datetime] = None):
         """
@@ -337,7 +712,7 @@ class DiaryDatabase:
 
     def get_active_projects(self) -> List[Dict[str, Any]]:
         """Get active projects"""
-        with self.get_connection() as conn:
+        with self.get_connection(write=False) as conn:
             projects = conn.execute(
                 """
                 SELECT * FROM projects
@@ -358,7 +733,7 @@ class DiaryDatabase:
 
     def get_media_history(self, media_type: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
         """Get media history, optionally filtered by type"""
-        with self.get_connection() as conn:
+        with self.get_connection(write=False) as conn:
             if media_type:
                 media = conn.execute(
                     """
@@ -378,18 +753,13 @@ class DiaryDatabase:
             return [dict(row) for row in media]
 
     def get_mood_timeline(self, days: int = 30) -> List[Dict[str, Any]]:
-        """Get mood trends over time"""
-        with self.get_connection() as conn:
+        """Get mood trends over time (served from the mood_daily rollup)"""
+        with self.get_connection(write=False) as conn:
             results = conn.execute(
                 """
-                SELECT
-                    DATE(e.timestamp) as date,
-                    m.emotion,
-                    AVG(m.score) as avg_score
-                FROM entries e
-                JOIN moods m ON e.id = m.entry_id
-                WHERE e.timestamp >= datetime('now', '-' || ? || ' days')
-                GROUP BY DATE(e.timestamp), m.emotion
+                SELECT date, emotion, total / cnt AS avg_score
+                FROM mood_daily
+                WHERE date >= date('now', '-' || ? || ' days')
                 ORDER BY date DESC
                 """,
                 (days,)
@@ -418,66 +788,73 @@ class DiaryDatabase:
         Returns:
             List of matching entries with metadata
         """
-        with self.get_connection() as conn:
-            # Build the query dynamically
-            sql = "SELECT DISTINCT e.* FROM entries e"
-            conditions = []
-            params = []
-
-            # Join moods if filtering by emotion
-            if emotions:
-                sql += " JOIN moods m ON e.id = m.entry_id"
-
-            sql += " WHERE 1=1"
-
-            # Text search
-            if query:
-                conditions.append("e.content LIKE ?")
+        with self.get_connection(write=False) as conn:
+            match_expr = self._fts_match_expression(query) if query and self._has_fts else None
+
+            # There are only a handful of possible query shapes - build each
+            # one once and reuse the cached SQL (and its cached plan)
+            shape = (
+                bool(match_expr),
+                bool(query and not match_expr),
+                bool(start_date),
+                bool(end_date),
+                len(emotions) if emotions else 0
+            )
+            sql = self._search_sql_cache.get(shape)
+
+            if sql is None:
+                sql = "SELECT DISTINCT e.* FROM entries e"
+                conditions = []
+
+                # Join moods if filtering by emotion
+                if emotions:
+                    sql += " JOIN moods m ON e.id = m.entry_id"
+
+                # Route text search through the FTS5 index when available
+                if match_expr:
+                    sql += " JOIN entries_fts ON entries_fts.rowid = e.id"
+                    conditions.append("entries_fts MATCH ?")
+                elif query:
+                    conditions.append("e.content LIKE ?")
+
+                sql += " WHERE 1=1"
+
+                # Date range filter
+                if start_date:
+                    conditions.append("e.timestamp >= ?")
+                if end_date:
+                    conditions.append("e.timestamp <= ?")
+
+                # Emotion filter (only entries where the emotion is significant)
+                if emotions:
+                    placeholders = ','.join('?' * len(emotions))
+                    conditions.append(f"m.emotion IN ({placeholders})")
+                    conditions.append("m.score > 0.3")
+
+                if conditions:
+                    sql += " AND " + " AND ".join(conditions)
+
+                # Order and limit
+                sql += " ORDER BY e.timestamp DESC LIMIT ?"
+
+                self._search_sql_cache[shape] = sql
+
+            # Bind parameters in the same order the shape emits placeholders
+            params: List[Any] = []
+            if match_expr:
+                params.append(match_expr)
+            elif query:
                 params.append(f"%{query}%")
-
-            # Date range filter
             if start_date:
-                conditions.append("e.timestamp >= ?")
                 params.append(start_date)
-
             if end_date:
-                conditions.append("e.timestamp <= ?")
                 params.append(end_date)
-
-            # Emotion filter
-            if emotions and len(emotions) > 0:
-                placeholders = ','.join('?' * len(emotions))
-                conditions.append(f"m.emotion IN ({placeholders})")
+            if emotions:
                 params.extend(emotions)
-                # Only include entries where emotion has significant score
-                conditions.append("m.score > 0.3")
-
-            # Add conditions
-            if conditions:
-                sql += " AND " + " AND ".join(conditions)
-
-            # Order and limit
-            sql += " ORDER BY e.timestamp DESC LIMIT ?"
             params.append(limit)
 
-            # Execute query
-            entries = conn.execute(sql, params).fetchall()
-
-            # Get moods for each entry
-            result = []
-            for entry in entries:
-                entry_dict = dict(entry)
-
-                # Get moods
-                moods = conn.execute(
-                    "SELECT emotion, score FROM moods WHERE entry_id = ?",
-                    (entry_dict["id"],)
-                ).fetchall()
-
-                entry_dict["moods"] = {row["emotion"]: row["score"] for row in moods}
-                result.append(entry_dict)
-
-            return result
+            # Execute with mood hydration in the same statement
+            return self._fetch_entries_with_moods(conn, sql, params)
 
     def set_user_preference(self, key: str, value: Any):
         """Store user preference or pattern"""
@@ -493,20 +870,30 @@ class DiaryDatabase:
                 (key, json.dumps(value), json.dumps(value))
             )
 
+        self._pref_cache[key] = value
+
     def get_user_preference(self, key: str) -> Optional[Any]:
         """Get user preference"""
-        with self.get_connection() as conn:
+        if key in self._pref_cache:
+            return self._pref_cache[key]
+
+        with self.get_connection(write=False) as conn:
             row = conn.execute(
                 "SELECT value FROM user_data WHERE key = ?",
                 (key,)
             ).fetchone()
 
             if row:
-                return json.loads(row["value"])
+                value = json.loads(row["value"])
+                self._pref_cache[key] = value
+                return value
             return None
 
     def verify_password(self) -> bool:
         """Verify the password is correct by checking hash"""
+        if self._password_verified is not None:
+            return self._password_verified
+
         try:
             with self.get_connection() as conn:
                 # Check if auth table exists
@@ -516,6 +903,7 @@ class DiaryDatabase:
 
                 if not result:
                     # New database, password is valid
+                    self._password_verified = True
                     return True
 
                 # Check password hash
@@ -523,10 +911,29 @@ class DiaryDatabase:
 
                 if not stored:
                     # No password set yet, accept any password
+                    self._password_verified = True
+                    return True
+
+                # Verify hash matches (constant-time compare)
+                stored_hash = stored["password_hash"]
+                if hmac.compare_digest(stored_hash, self._password_hash or ""):
+                    self._password_verified = True
+                    return True
+
+                # Databases created before PBKDF2 stored plain SHA-256 -
+                # accept and upgrade the stored hash in place
+                if self.password is not None and hmac.compare_digest(
+                    stored_hash, self._legacy_hash_password(self.password)
+                ):
+                    conn.execute(
+                        "UPDATE auth SET password_hash = ? WHERE id = 1",
+                        (self._password_hash,)
+                    )
+                    self._password_verified = True
                     return True
 
-                # Verify hash matches
-                return stored["password_hash"] == self._password_hash
+                self._password_verified = False
+                return False
 
         except Exception as e:
             print(f"Password verification error: {e}")
@@ -548,7 +955,7 @@ class DiaryDatabase:
 
     def get_chat_sessions(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get all chat sessions"""
-        with self.get_connection() as conn:
+        with self.get_connection(write=False) as conn:
             sessions = conn.execute(
                 """
                 SELECT cs.*,
@@ -567,7 +974,7 @@ class DiaryDatabase:
 
     def get_chat_session(self, session_id: int) -> Optional[Dict[str, Any]]:
         """Get a specific chat session"""
-        with self.get_connection() as conn:
+        with self.get_connection(write=False) as conn:
             session = conn.execute(
                 "SELECT * FROM chat_sessions WHERE id = ?",
                 (session_id,)
@@ -581,8 +988,6 @@ class DiaryDatabase:
         """Delete a chat session (cascades to messages)"""
         with self.get_connection() as conn:
             conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
-            # Reclaim disk space after deletion
-            conn.execute("VACUUM")
 
     def update_chat_session_title(self, session_id: int, title: str):
         """Update chat session title"""
@@ -610,7 +1015,7 @@ class DiaryDatabase:
 
     def get_chat_messages(self, session_id: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get messages for a chat session"""
-        with self.get_connection() as conn:
+        with self.get_connection(write=False) as conn:
             if limit:
                 messages = conn.execute(
                     """
@@ -633,8 +1038,36 @@ class DiaryDatabase:
         """Clear all messages in a chat session"""
         with self.get_connection() as conn:
             conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
-            # Reclaim disk space
-            conn.execute("VACUUM")
+
+    def maintenance(self):
+        """Periodic upkeep: reclaim freed pages and refresh planner stats"""
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA incremental_vacuum(1000)")
+            conn.execute("PRAGMA optimize")
+
+    def _schedule_maintenance(self, interval_seconds: float = 24 * 3600):
+        """Run maintenance() daily on a background timer"""
+        def run():
+            try:
+                self.maintenance()
+            except Exception as e:
+                print(f"Warning: database maintenance failed: {e}")
+            finally:
+                # Each Timer fires on a fresh thread - drop its cached
+                # connection so they don't accumulate across days
+                conn = getattr(self._tls, "conn", None)
+                if conn is not None:
+                    with self._connections_lock:
+                        if conn in self._all_connections:
+                            self._all_connections.remove(conn)
+                    conn.close()
+                    self._tls.conn = None
+
+            self._schedule_maintenance(interval_seconds)
+
+        self._maintenance_timer = threading.Timer(interval_seconds, run)
+        self._maintenance_timer.daemon = True
+        self._maintenance_timer.start()
 
 
 # Global instance
@@ -4,7 +4,12 @@ Run this once to download the model files to the models/ directory
 """
 
 import os
+import shutil
+import subprocess
+import threading
+import time
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 MODEL_DIR = Path(__file__).parent.parent / "models"
@@ -20,6 +25,29 @@ FILES_TO_DOWNLOAD = {
     "mmproj": "mmproj-huihui-qwen3-vl-2b-instruct-abliterated-f16.gguf"
 }
 
+# 4 MB writes keep the syscall count low on multi-GB files
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Both files download concurrently - serialize progress output
+_print_lock = threading.Lock()
+
+
+def _download_with_tool(url: str, part: Path) -> bool:
+    """
+    Delegate to aria2c/curl when installed - multi-connection + native TLS
+
+    Downloads into the .part file so a killed run never leaves a
+    truncated file at the final path; the caller renames on success.
+    """
+    if shutil.which("aria2c"):
+        cmd = ["aria2c", "-c", "-x", "8", "-s", "8", "-o", part.name, "-d", str(part.parent), url]
+    elif shutil.which("curl"):
+        cmd = ["curl", "-L", "--fail", "-C", "-", "-o", str(part), url]
+    else:
+        return False
+
+    return subprocess.run(cmd).returncode == 0
+
 
 def download_file(url: str, dest: Path):
     """Download file with progress bar"""
@@ -30,17 +58,54 @@ def download_file(url: str, dest: Path):
     print(f"Downloading {dest.name}...")
     print(f"From: {url}")
 
-    def progress_hook(count, block_size, total_size):
-        percent = min(int(count * block_size * 100 / total_size), 100)
-        print(f"\r  Progress: {percent}%", end="", flush=True)
+    # Everything downloads into a .part file (interrupted transfers resume
+    # from it) and only a completed transfer is renamed into place
+    part = dest.with_suffix(dest.suffix + ".part")
 
     try:
-        urllib.request.urlretrieve(url, dest, progress_hook)
+        if _download_with_tool(url, part):
+            part.rename(dest)
+            print(f"✓ Downloaded {dest.name}")
+            return
+
+        offset = part.stat().st_size if part.exists() else 0
+
+        request = urllib.request.Request(url)
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+            print(f"  Resuming {dest.name} at {offset / (1024 * 1024):.1f} MB")
+
+        # Stream with large buffered writes; report progress at most
+        # every 250 ms instead of once per tiny block
+        with urllib.request.urlopen(request) as response:
+            if offset and response.status != 206:
+                # Server ignored the Range header - start over
+                offset = 0
+
+            with open(part, "ab" if offset else "wb") as f:
+                total_size = offset + int(response.headers.get("Content-Length", 0))
+                downloaded = offset
+                last_report = 0.0
+
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    downloaded += len(chunk)
+
+                    now = time.monotonic()
+                    if total_size and now - last_report >= 0.25:
+                        percent = min(downloaded * 100 // total_size, 100)
+                        with _print_lock:
+                            print(f"\r  {dest.name}: {percent}%", end="", flush=True)
+                        last_report = now
+
+        part.rename(dest)
         print(f"\n✓ Downloaded {dest.name}")
     except Exception as e:
+        # Keep the .part file so the next run resumes from here
         print(f"\n✗ Error downloading {dest.name}: {e}")
-        if dest.exists():
-            dest.unlink()
 
 
 def main():
@@ -49,10 +114,14 @@ def main():
     print("=" * 60)
     print(f"\nDownloading to: {MODEL_DIR.absolute()}\n")
 
-    for file_type, filename in FILES_TO_DOWNLOAD.items():
-        url = BASE_URL + filename
-        dest = MODEL_DIR / filename
-        download_file(url, dest)
+    # The model and mmproj files share no state - fetch them concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(download_file, BASE_URL + filename, MODEL_DIR / filename)
+            for filename in FILES_TO_DOWNLOAD.values()
+        ]
+        for future in futures:
+            future.result()
 
     print("\n" + "=" * 60)
     print("Download complete!")
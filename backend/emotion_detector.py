@@ -5,11 +5,46 @@ Uses calibrated models and robust aggregation for reliable results
 """
 
 from typing import Dict, List, Tuple, Any, Optional
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
 import re
 import numpy as np
-from transformers import pipeline
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 import torch
 
+PRIMARY_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+
+# Cached INT8 ONNX export lives next to the GGUF models
+ONNX_QUANT_DIR = Path(__file__).parent.parent / "models" / "emotion-onnx-int8"
+
+# Calibration indicators, fused into one alternation each so the text is
+# scanned once per group instead of once per sub-pattern
+_CONVERSATIONAL_RE = re.compile(
+    r'\b(?:hey|hi|hello|thanks|please|maybe|think|feel|just'
+    r'|haha|lol|btw|tbh|ngl'  # Internet slang
+    r'|wondering|curious|interested)\b'
+    r'|\?',  # Questions
+    re.IGNORECASE
+)
+_AGGRESSIVE_RE = re.compile(
+    r'\b(?:hate|angry|furious|rage|damn|hell)\b'
+    r'|[!]{2,}'  # Multiple exclamation marks
+    r'|[A-Z]{4,}'  # ALL CAPS words
+)
+
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+
+# Fixed emotion order for the vectorized calibration pass
+_CALIB_EMOTIONS = ("joy", "sadness", "anger", "fear", "love", "surprise")
+# Conversational dampening: scale factors and caps per emotion
+_DAMPEN_FACTORS = np.array([1.2, 0.5, 0.3, 0.4, 1.0, 1.0], dtype=np.float32)
+_DAMPEN_CAPS = np.array([np.inf, 0.5, 0.4, 0.4, np.inf, np.inf], dtype=np.float32)
+
+
+# Re-rendered entries hit this far more often than new text appears
+_RESULT_CACHE_SIZE = 256
+
 
 class EmotionDetector:
     """Detect emotions and mood from journal text with professional accuracy"""
@@ -18,27 +53,40 @@ class EmotionDetector:
         """Initialize emotion detection model"""
         print("Loading emotion detection model...")
 
+        # LRU of detect_emotions results keyed by text hash - editing or
+        # re-viewing an entry re-analyzes identical text constantly
+        self._result_cache: "OrderedDict[bytes, Dict[str, float]]" = OrderedDict()
+
+        # Scratch vector reused by every _calibrate_scores call
+        self._calib_buf = np.empty(len(_CALIB_EMOTIONS), dtype=np.float32)
+
+        self._torch_model = None
+        self._torch_tokenizer = None
+        self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._ort_model = None
+        self._ort_tokenizer = None
+
+        # On CPU, prefer an INT8 ONNX export (4x smaller weights, VNNI int8
+        # matmuls) when optimum/onnxruntime are installed
+        if not torch.cuda.is_available():
+            try:
+                self._load_onnx_quantized()
+                print("✓ Using INT8 ONNX export of j-hartmann model")
+            except Exception as e:
+                print(f"Note: ONNX runtime path unavailable ({e}), using PyTorch")
+
         # Use the more reliable and well-calibrated j-hartmann model
         # This model is specifically trained for nuanced emotion detection
         # and produces better-calibrated probability scores
-        try:
-            self.emotion_classifier = pipeline(
-                "text-classification",
-                model="j-hartmann/emotion-english-distilroberta-base",
-                top_k=None,  # Return all emotion scores
-                device=0 if torch.cuda.is_available() else -1
-            )
-            print("✓ Using j-hartmann/emotion-english-distilroberta-base (professional)")
-        except Exception as e:
-            print(f"Warning: Could not load primary model, falling back: {e}")
-            # Fallback to the older model if needed
-            self.emotion_classifier = pipeline(
-                "text-classification",
-                model="bhadresh-savani/distilbert-base-uncased-emotion",
-                top_k=None,
-                device=0 if torch.cuda.is_available() else -1
-            )
-            print("✓ Using fallback emotion model")
+        if self._ort_model is None:
+            try:
+                self._load_torch_model(PRIMARY_MODEL)
+                print("✓ Using j-hartmann/emotion-english-distilroberta-base (professional)")
+            except Exception as e:
+                print(f"Warning: Could not load primary model, falling back: {e}")
+                # Fallback to the older model if needed
+                self._load_torch_model("bhadresh-savani/distilbert-base-uncased-emotion")
+                print("✓ Using fallback emotion model")
 
         # Map model labels to our emotion categories
         self.emotion_map = {
@@ -53,6 +101,128 @@ class EmotionDetector:
 
         print("✓ Emotion detection model loaded")
 
+    def _load_torch_model(self, model_name: str):
+        """Load tokenizer + model directly - the pipeline wrapper adds
+        per-call Python preprocessing overhead we don't need"""
+        self._torch_tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+        # low_cpu_mem_usage streams mmap'd safetensors weights straight into
+        # place - no double allocation, and fork-based workers share the
+        # read-only pages copy-on-write
+        model = AutoModelForSequenceClassification.from_pretrained(
+            model_name, low_cpu_mem_usage=True
+        )
+        model = model.eval().to(self._device)
+
+        # Inference-only workload: FP16 halves memory bandwidth and uses
+        # tensor cores on GPU with no measurable quality loss
+        if self._device == "cuda":
+            model = model.half()
+            torch.backends.cudnn.benchmark = True
+            torch.set_float32_matmul_precision("high")
+
+        # Compile the forward pass (padded shapes are stable); the one-off
+        # compile cost is paid here by a warmup forward, not on the first
+        # user request
+        if hasattr(torch, "compile"):
+            try:
+                model = torch.compile(model, mode="reduce-overhead", dynamic=False)
+                warmup = self._torch_tokenizer(
+                    ["warmup"], padding=True, truncation=True, return_tensors="pt"
+                ).to(self._device)
+                with torch.inference_mode():
+                    model(**warmup)
+            except Exception as e:
+                print(f"Note: torch.compile skipped: {e}")
+
+        self._torch_model = model
+
+    def _load_onnx_quantized(self):
+        """Load (exporting + quantizing once) the INT8 ONNX emotion model"""
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        if not any(ONNX_QUANT_DIR.glob("*.onnx")):
+            # One-time export + dynamic INT8 quantization, cached on disk
+            model = ORTModelForSequenceClassification.from_pretrained(
+                PRIMARY_MODEL, export=True
+            )
+            quantizer = ORTQuantizer.from_pretrained(model)
+            quantizer.quantize(
+                save_dir=ONNX_QUANT_DIR,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(
+                    is_static=False, per_channel=False
+                )
+            )
+
+        self._ort_model = ORTModelForSequenceClassification.from_pretrained(ONNX_QUANT_DIR)
+        self._ort_tokenizer = AutoTokenizer.from_pretrained(PRIMARY_MODEL)
+
+    @staticmethod
+    def _format_results(probs: List[List[float]], id2label: Dict[int, str]) -> List[List[Dict]]:
+        """Turn per-chunk probability rows into pipeline-style label/score dicts"""
+        return [
+            [{"label": id2label[i], "score": p} for i, p in enumerate(row)]
+            for row in probs
+        ]
+
+    def _classify(self, chunks: List[str]) -> List[List[Dict]]:
+        """Run all chunks through the active backend in one batched pass"""
+        if self._ort_model is not None:
+            inputs = self._ort_tokenizer(
+                chunks, padding=True, truncation=True, max_length=512, return_tensors="pt"
+            )
+            logits = self._ort_model(**inputs).logits
+            probs = torch.softmax(logits, dim=-1).tolist()
+            return self._format_results(probs, self._ort_model.config.id2label)
+
+        inputs = self._torch_tokenizer(
+            chunks, padding=True, truncation=True, max_length=512, return_tensors="pt"
+        ).to(self._device)
+
+        with torch.inference_mode():
+            logits = self._torch_model(**inputs).logits
+
+        probs = torch.softmax(logits.float(), dim=-1).cpu().tolist()
+        return self._format_results(probs, self._torch_model.config.id2label)
+
+    def _classify_text(self, text: str) -> List[List[Dict]]:
+        """
+        Tokenize once with overflowing windows so chunks align exactly with
+        the model's 512-token context - no character-based splits that cut
+        tokens mid-word, and no wasted padding
+        """
+        if self._ort_model is not None:
+            tokenizer, model = self._ort_tokenizer, self._ort_model
+        else:
+            tokenizer, model = self._torch_tokenizer, self._torch_model
+
+        encoded = tokenizer(
+            text,
+            max_length=512,
+            truncation=True,
+            return_overflowing_tokens=True,
+            stride=32,
+            padding=True,
+            return_tensors="pt"
+        )
+        inputs = {
+            key: value for key, value in encoded.items()
+            if key in ("input_ids", "attention_mask", "token_type_ids")
+        }
+
+        if self._ort_model is not None:
+            logits = model(**inputs).logits
+            probs = torch.softmax(logits, dim=-1).tolist()
+        else:
+            inputs = {key: value.to(self._device) for key, value in inputs.items()}
+            with torch.inference_mode():
+                logits = model(**inputs).logits
+            probs = torch.softmax(logits.float(), dim=-1).cpu().tolist()
+
+        return self._format_results(probs, model.config.id2label)
+
     def detect_emotions(self, text: str, chunk_size: int = 512) -> Dict[str, float]:
         """
         Detect emotions from text with professional-grade calibration
@@ -67,19 +237,21 @@ class EmotionDetector:
         if not text.strip():
             return self._neutral_emotions()
 
-        # Split long texts into chunks
-        chunks = self._split_text(text, chunk_size)
+        cache_key = hashlib.blake2b(
+            f"{chunk_size}:{text}".encode(), digest_size=16
+        ).digest()
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            self._result_cache.move_to_end(cache_key)
+            return dict(cached)
 
-        # Analyze each chunk
-        all_results = []
-        for chunk in chunks:
-            if chunk.strip():
-                try:
-                    results = self.emotion_classifier(chunk)[0]
-                    all_results.append(results)
-                except Exception as e:
-                    print(f"Warning: Emotion detection error on chunk: {e}")
-                    continue
+        # The tokenizer chunks the text itself into overlapping 512-token
+        # windows and everything runs in one batched forward pass
+        try:
+            all_results = self._classify_text(text)
+        except Exception as e:
+            print(f"Warning: Emotion detection error: {e}")
+            return self._neutral_emotions()
 
         if not all_results:
             return self._neutral_emotions()
@@ -90,8 +262,50 @@ class EmotionDetector:
         # Apply calibration to prevent extreme scores
         emotion_scores = self._calibrate_scores(emotion_scores, text)
 
+        self._result_cache[cache_key] = dict(emotion_scores)
+        while len(self._result_cache) > _RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
         return emotion_scores
 
+    def detect_emotions_batch(self, texts: List[str], chunk_size: int = 512) -> List[Dict[str, float]]:
+        """
+        Detect emotions for several texts with one batched forward pass
+
+        All chunks from all texts go through the classifier together and
+        the results are regrouped per source text afterwards.
+
+        Args:
+            texts: Input texts to analyze
+            chunk_size: Max characters per chunk (for long texts)
+
+        Returns:
+            One emotion dict per input text, in order
+        """
+        all_chunks: List[str] = []
+        chunk_owner: List[int] = []
+
+        for i, text in enumerate(texts):
+            for chunk in self._split_text(text, chunk_size):
+                if chunk.strip():
+                    all_chunks.append(chunk)
+                    chunk_owner.append(i)
+
+        results_per_text: List[List[List[Dict]]] = [[] for _ in texts]
+        if all_chunks:
+            try:
+                raw = self._classify(all_chunks)
+                for owner, result in zip(chunk_owner, raw):
+                    results_per_text[owner].append(result)
+            except Exception as e:
+                print(f"Warning: Emotion detection error: {e}")
+
+        return [
+            self._calibrate_scores(self._aggregate_emotions_robust(chunk_results), text)
+            if chunk_results else self._neutral_emotions()
+            for text, chunk_results in zip(texts, results_per_text)
+        ]
+
     def get_dominant_emotion(self, emotions: Dict[str, float]) -> Tuple[str, float]:
         """
         Get the dominant emotion
@@ -117,11 +331,16 @@ class EmotionDetector:
         Returns:
             Description like "Joyful with hints of surprise"
         """
-        # Sort by score
-        sorted_emotions = sorted(emotions.items(), key=lambda x: -x[1])
+        # Only the top two emotions matter - one linear scan, no sort
+        primary, primary_score = None, -1.0
+        secondary, secondary_score = None, -1.0
 
-        # Primary emotion
-        primary, primary_score = sorted_emotions[0]
+        for emotion, score in emotions.items():
+            if score > primary_score:
+                secondary, secondary_score = primary, primary_score
+                primary, primary_score = emotion, score
+            elif score > secondary_score:
+                secondary, secondary_score = emotion, score
 
         # Require higher threshold for non-neutral classification
         if primary_score < 0.35:
@@ -130,10 +349,8 @@ class EmotionDetector:
         description = primary.capitalize()
 
         # Add secondary emotion if significant
-        if len(sorted_emotions) > 1:
-            secondary, secondary_score = sorted_emotions[1]
-            if secondary_score > 0.25 and secondary != "neutral":
-                description += f" with hints of {secondary}"
+        if secondary is not None and secondary_score > 0.25 and secondary != "neutral":
+            description += f" with hints of {secondary}"
 
         return description
 
@@ -173,26 +390,38 @@ class EmotionDetector:
 
     def _split_text(self, text: str, chunk_size: int) -> List[str]:
         """Split text into chunks at sentence boundaries"""
-        # Try to split at sentence boundaries
-        sentences = re.split(r'[.!?]+', text)
-
         chunks = []
-        current_chunk = ""
-
-        for sentence in sentences:
+        # Accumulate sentence parts and track the length as an int - string
+        # += would copy the growing chunk on every append
+        parts: List[str] = []
+        current_len = 0
+        pos = 0
+
+        # Stream sentence spans from the boundary matches instead of
+        # materializing a list of every sentence up front
+        def add_sentence(sentence: str):
+            nonlocal current_len
             sentence = sentence.strip()
             if not sentence:
-                continue
+                return
 
-            if len(current_chunk) + len(sentence) < chunk_size:
-                current_chunk += sentence + ". "
+            if current_len + len(sentence) < chunk_size:
+                parts.append(sentence + ". ")
+                current_len += len(sentence) + 2
             else:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = sentence + ". "
+                if parts:
+                    chunks.append("".join(parts))
+                parts[:] = [sentence + ". "]
+                current_len = len(sentence) + 2
+
+        for match in _SENTENCE_END_RE.finditer(text):
+            add_sentence(text[pos:match.start()])
+            pos = match.end()
+
+        add_sentence(text[pos:])
 
-        if current_chunk:
-            chunks.append(current_chunk)
+        if parts:
+            chunks.append("".join(parts))
 
         return chunks if chunks else [text[:chunk_size]]
 
@@ -206,38 +435,28 @@ class EmotionDetector:
         if not all_results:
             return self._neutral_emotions()
 
-        # Collect scores per emotion across all chunks
-        emotion_scores_per_chunk = []
-
-        for result_group in all_results:
-            # Each chunk gets a dict of its emotion scores
-            chunk_emotions = {}
+        # One (n_chunks, n_emotions) float32 matrix replaces the per-chunk
+        # dict building and per-emotion np.mean calls
+        columns = {emotion: i for i, emotion in enumerate(self.emotion_map.values())}
+        scores = np.zeros((len(all_results), len(columns)), dtype=np.float32)
 
+        for row, result_group in enumerate(all_results):
             for result in result_group:
-                label = result["label"].lower()
-                score = result["score"]
-
-                if label in self.emotion_map:
-                    emotion = self.emotion_map[label]
-                    chunk_emotions[emotion] = score
-
-            # Normalize scores for this chunk to sum to 1 (proper probability distribution)
-            total = sum(chunk_emotions.values())
-            if total > 0:
-                chunk_emotions = {k: v / total for k, v in chunk_emotions.items()}
-
-            emotion_scores_per_chunk.append(chunk_emotions)
+                emotion = self.emotion_map.get(result["label"].lower())
+                if emotion is not None:
+                    scores[row, columns[emotion]] = result["score"]
 
-        # Average across chunks
-        final_emotions = {}
-        for emotion in self.emotion_map.values():
-            if emotion == "neutral":
-                continue  # Handle neutral separately
+        # Normalize each chunk to a probability distribution, then average
+        # across chunks (neutral participates in normalization but is
+        # handled separately downstream)
+        scores /= scores.sum(axis=1, keepdims=True).clip(min=1e-9)
+        mean = scores.mean(axis=0)
 
-            scores = [chunk.get(emotion, 0.0) for chunk in emotion_scores_per_chunk]
-            final_emotions[emotion] = np.mean(scores) if scores else 0.0
-
-        return final_emotions
+        return {
+            emotion: float(mean[i])
+            for emotion, i in columns.items()
+            if emotion != "neutral"
+        }
 
     def _calibrate_scores(self, emotions: Dict[str, float], text: str) -> Dict[str, float]:
         """
@@ -247,58 +466,40 @@ class EmotionDetector:
         We apply sensible constraints based on text characteristics.
         """
         # Detect conversational indicators (questions, greetings, casual language)
-        conversational_indicators = [
-            r'\b(hey|hi|hello|thanks|please|maybe|think|feel|just)\b',
-            r'\?',  # Questions
-            r'\b(haha|lol|btw|tbh|ngl)\b',  # Internet slang
-            r'\b(wondering|curious|interested)\b'
-        ]
-
-        is_conversational = any(re.search(pattern, text.lower()) for pattern in conversational_indicators)
+        is_conversational = _CONVERSATIONAL_RE.search(text) is not None
 
         # Detect aggressive indicators
-        aggressive_indicators = [
-            r'\b(hate|angry|furious|rage|damn|hell)\b',
-            r'[!]{2,}',  # Multiple exclamation marks
-            r'[A-Z]{4,}',  # ALL CAPS words
-        ]
+        is_aggressive = _AGGRESSIVE_RE.search(text) is not None
 
-        is_aggressive = any(re.search(pattern, text) for pattern in aggressive_indicators)
+        # Apply calibration on a fixed-order vector - the dict version did
+        # ~15 lookups and several max()/comprehension scans per call. The
+        # scratch buffer is reused across calls (no allocation).
+        v = self._calib_buf
+        for i, emotion in enumerate(_CALIB_EMOTIONS):
+            v[i] = emotions.get(emotion, 0.0)
 
-        # Apply calibration
-        calibrated = emotions.copy()
-
-        # If conversational but not aggressive, reduce negative emotions
+        # If conversational but not aggressive, dampen negative emotions
+        # significantly and boost joy slightly
         if is_conversational and not is_aggressive:
-            # Dampen negative emotions significantly
-            calibrated['anger'] = min(calibrated.get('anger', 0) * 0.3, 0.4)
-            calibrated['fear'] = min(calibrated.get('fear', 0) * 0.4, 0.4)
-            calibrated['sadness'] = min(calibrated.get('sadness', 0) * 0.5, 0.5)
-
-            # Boost joy/neutral slightly
-            calibrated['joy'] = calibrated.get('joy', 0) * 1.2
+            np.multiply(v, _DAMPEN_FACTORS, out=v)
+            np.minimum(v, _DAMPEN_CAPS, out=v)
 
         # Prevent any single emotion from dominating unrealistically (>80%)
-        max_emotion = max(calibrated.values()) if calibrated else 0
+        max_emotion = v.max()
         if max_emotion > 0.8:
-            # Scale everything down proportionally
-            scale_factor = 0.8 / max_emotion
-            calibrated = {k: v * scale_factor for k, v in calibrated.items()}
+            v *= 0.8 / max_emotion
 
         # Ensure some emotional diversity (prevent 95%+ single emotion)
         # Add a small baseline to other emotions
-        max_val = max(calibrated.values()) if calibrated else 0
-        if max_val > 0.7:
-            for emotion in calibrated:
-                if calibrated[emotion] < 0.1:
-                    calibrated[emotion] = max(calibrated[emotion], 0.05)
+        if v.max() > 0.7:
+            np.maximum(v, 0.05, out=v)
 
         # Renormalize to sum to ~1.0
-        total = sum(calibrated.values())
+        total = v.sum()
         if total > 0:
-            calibrated = {k: v / total for k, v in calibrated.items()}
+            v /= total
 
-        return calibrated
+        return dict(zip(_CALIB_EMOTIONS, v.tolist()))
 
     def _neutral_emotions(self) -> Dict[str, float]:
         """Return neutral emotion scores with slight joy bias (default positive)"""
@@ -113,6 +113,14 @@ async def startup_event():
         print("=" * 60 + "\n")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close database connections (runs PRAGMA optimize on the way out)"""
+    db = app_state.get("db")
+    if db:
+        db.close()
+
+
 # CORS middleware for local development
 app.add_middleware(
     CORSMiddleware,
@@ -152,7 +160,11 @@ async def unlock(request: UnlockRequest):
         # Initialize schema
         db.initialize_schema()
 
-        # Store in app state
+        # Store in app state, releasing the previous instance's cached
+        # connections and maintenance timer
+        old_db = app_state.get("db")
+        if old_db is not None:
+            old_db.close()
         app_state["db"] = db
         app_state["unlocked"] = True
 
@@ -214,13 +226,15 @@ async def mobile_login(request: MobileLoginRequest):
         db = DiaryDatabase(password=request.password)
 
         if not db.verify_password():
+            # Release the verification connection
+            db.close()
             raise HTTPException(status_code=401, detail="Incorrect password")
 
-        # Initialize schema
-        db.initialize_schema()
-
         # Initialize app state if not already done (same as desktop unlock)
         if not app_state.get("unlocked"):
+            # Initialize schema (also starts the maintenance timer)
+            db.initialize_schema()
+
             app_state["db"] = db
             app_state["unlocked"] = True
 
@@ -245,6 +259,10 @@ async def mobile_login(request: MobileLoginRequest):
                 except Exception as e:
                     print(f"Warning: Could not load Qwen model: {e}")
                     app_state["qwen"] = None
+        else:
+            # Already unlocked - this instance only verified the password;
+            # drop its cached connection (and never start its timer)
+            db.close()
 
         # Create JWT token valid for 30 days
         token = create_access_token(request.password)
@@ -323,31 +341,24 @@ async def mobile_sync(
                     else:
                         entry_time = datetime.now()
 
-                    # Create entry in database
-                    entry_id = db.add_entry(
+                    # Detect emotions and patterns if available
+                    emotions = emotion_detector.detect_emotions(content) if emotion_detector else {}
+                    patterns = pattern_analyzer.extract_all(content) if pattern_analyzer else {}
+                    projects = patterns.get("projects", [])
+                    media = patterns.get("media", [])
+
+                    # Create entry + moods + patterns in one transaction
+                    entry_id = db.save_entry_atomic(
                         content=content,
+                        emotions=emotions,
+                        projects=projects,
+                        media=media,
                         image_path=None,  # Images handled separately
                         timestamp=entry_time
                     )
 
-                    # Detect emotions if available
-                    if emotion_detector:
-                        emotions = emotion_detector.detect_emotions(content)
-                        db.add_mood(entry_id, emotions)
-
-                    # Extract patterns if available
-                    if pattern_analyzer:
-                        projects = pattern_analyzer.extract_projects(content)
-                        for project in projects:
-                            db.link_project_to_entry(entry_id, project["name"], project["type"])
-
-                        media = pattern_analyzer.extract_media(content)
-                        for item in media:
-                            db.add_media_mention(entry_id, item["type"], item["title"])
-
                     # Add to RAG if available
                     if rag and emotion_detector:
-                        emotions = emotion_detector.detect_emotions(content)
                         mood_metadata = {f"mood_{emotion}": score for emotion, score in emotions.items()}
                         rag.add_entry(
                             entry_id=entry_id,
@@ -782,26 +793,22 @@ async def create_entry(
             with open(image_path, "wb") as f:
                 f.write(await image.read())
 
-        # Create entry in database
-        entry_id = db.add_entry(
+        # Detect emotions and extract patterns (one scan for projects + media)
+        emotions = emotion_detector.detect_emotions(content)
+        patterns = pattern_analyzer.extract_all(content)
+        projects = patterns["projects"]
+        media = patterns["media"]
+
+        # Create entry + moods + patterns in one transaction
+        entry_id = db.save_entry_atomic(
             content=content,
+            emotions=emotions,
+            projects=projects,
+            media=media,
             image_path=str(image_path) if image_path else None,
             timestamp=entry_time
         )
 
-        # Detect emotions
-        emotions = emotion_detector.detect_emotions(content)
-        db.add_mood(entry_id, emotions)
-
-        # Extract patterns
-        projects = pattern_analyzer.extract_projects(content)
-        for project in projects:
-            db.link_project_to_entry(entry_id, project["name"], project["type"])
-
-        media = pattern_analyzer.extract_media(content)
-        for item in media:
-            db.add_media_mention(entry_id, item["type"], item["title"])
-
         # Add to RAG vector database
         # ChromaDB only accepts flat metadata, so convert moods to separate fields
         mood_metadata = {f"mood_{emotion}": score for emotion, score in emotions.items()}
@@ -873,6 +880,12 @@ async def delete_entry(entry_id: int):
         # Delete from SQLite
         db.delete_entry(entry_id)
 
+        # The entry's project mentions sat below the analytics cache's
+        # high-water mark - force a rebuild
+        analytics = app_state.get("analytics")
+        if analytics:
+            analytics.invalidate_project_mentions()
+
         return {"success": True, "message": "Entry deleted"}
 
     except Exception as e:
@@ -926,14 +939,19 @@ async def update_entry(
             conn.execute("DELETE FROM project_mentions WHERE entry_id = ?", (entry_id,))
             conn.execute("DELETE FROM media_mentions WHERE entry_id = ?", (entry_id,))
 
-        projects = pattern_analyzer.extract_projects(content)
-        for project in projects:
+        patterns = pattern_analyzer.extract_all(content)
+        for project in patterns["projects"]:
             db.link_project_to_entry(entry_id, project["name"], project["type"])
 
-        media = pattern_analyzer.extract_media(content)
-        for item in media:
+        for item in patterns["media"]:
             db.add_media_mention(entry_id, item["type"], item["title"])
 
+        # Mentions were rewritten under an existing entry id (below the
+        # analytics cache's high-water mark) - force a rebuild
+        analytics = app_state.get("analytics")
+        if analytics:
+            analytics.invalidate_project_mentions()
+
         # Update in RAG vector database
         mood_metadata = {f"mood_{emotion}": score for emotion, score in emotions.items()}
         rag.update_entry(
@@ -947,7 +965,7 @@ async def update_entry(
             "success": True,
             "entry_id": entry_id,
             "emotions": emotions,
-            "projects": [p["name"] for p in projects]
+            "projects": [p["name"] for p in patterns["projects"]]
         }
 
     except Exception as e:
@@ -4,6 +4,7 @@ JWT-based authentication for mobile app access with secure token management
 """
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 import secrets
 import hashlib
@@ -67,6 +68,11 @@ def _get_or_create_secret_key() -> str:
     return secret_key
 
 
+# Loaded once at import - re-reading the key file per token operation is
+# a syscall per request for a value that never changes
+_SECRET_KEY = _get_or_create_secret_key()
+
+
 def create_access_token(password: str, expires_delta: Optional[timedelta] = None) -> Token:
     """
     Create JWT access token for mobile authentication
@@ -90,7 +96,7 @@ def create_access_token(password: str, expires_delta: Optional[timedelta] = None
     expire = datetime.utcnow() + expires_delta
 
     # Hash the password for the token payload (never store plaintext)
-    password_hash = hashlib.sha256(password.encode()).hexdigest()
+    password_hash = hash_password(password)
 
     to_encode = {
         "password_hash": password_hash,
@@ -99,8 +105,7 @@ def create_access_token(password: str, expires_delta: Optional[timedelta] = None
         "iat": datetime.utcnow()
     }
 
-    secret_key = _get_or_create_secret_key()
-    encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _SECRET_KEY, algorithm=ALGORITHM)
 
     return Token(
         access_token=encoded_jwt,
@@ -126,8 +131,7 @@ def verify_token(token: str) -> Optional[str]:
         raise MobileAuthError("JWT library not available - install python-jose[cryptography]")
 
     try:
-        secret_key = _get_or_create_secret_key()
-        payload = jwt.decode(token, secret_key, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _SECRET_KEY, algorithms=[ALGORITHM])
 
         password_hash: str = payload.get("password_hash")
         if password_hash is None:
@@ -140,17 +144,22 @@ def verify_token(token: str) -> Optional[str]:
         return None
 
 
+@lru_cache(maxsize=64)
 def hash_password(password: str) -> str:
     """
-    Hash a password for comparison
+    Hash a password for the token payload (memoized - the same password
+    is hashed on every authenticated request)
+
+    blake2b has tuned SSE/NEON paths and beats stdlib SHA-256 on ARM.
+    This is a payload identifier, not a password-storage hash.
 
     Args:
         password: Plain text password
 
     Returns:
-        SHA256 hash of password
+        blake2b hash of password
     """
-    return hashlib.sha256(password.encode()).hexdigest()
+    return hashlib.blake2b(password.encode(), digest_size=32).hexdigest()
 
 
 def extract_password_from_token(token: str) -> Optional[str]:
@@ -168,11 +177,9 @@ def extract_password_from_token(token: str) -> Optional[str]:
         return None
 
     try:
-        # Don't verify signature, just decode
-        secret_key = _get_or_create_secret_key()
         payload = jwt.decode(
             token,
-            secret_key,
+            _SECRET_KEY,
             algorithms=[ALGORITHM],
             options={"verify_signature": True, "verify_exp": True}
         )
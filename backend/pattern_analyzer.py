@@ -8,6 +8,18 @@ from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 
+import numpy as np
+
+# Fixed emotion order for array-based mood accumulation
+EMOTIONS = ("joy", "sadness", "anger", "fear", "love", "surprise")
+_EMOTION_IDX = {emotion: i for i, emotion in enumerate(EMOTIONS)}
+
+# Pre-compiled cleanup patterns (shared by every extraction call)
+_TRAILING_PUNCT_RE = re.compile(r'[,;:.!?]+$')
+_TITLE_TRAILER_RE = re.compile(
+    r'\s+(?:yesterday|today|tonight|last night|earlier).*$', re.IGNORECASE
+)
+
 
 class PatternAnalyzer:
     """Analyze patterns in journal entries"""
@@ -28,6 +40,47 @@ class PatternAnalyzer:
         "activity": r"(?:went to|visited|attended)\s+([A-Za-z0-9\s-]+)",
     }
 
+    # Compiled once at class creation; hot paths just call .finditer(text)
+    _COMPILED_PATTERNS = {
+        key: re.compile(pattern, re.IGNORECASE) for key, pattern in PATTERNS.items()
+    }
+
+    # Common words stripped from extracted project names
+    _STOP_WORDS = frozenset({"the", "a", "an", "my", "this", "that", "on", "in"})
+
+    # Union alternations so project and media extraction each traverse the
+    # text once; branch priority follows declaration order
+    _PROJECT_KEYS = ("started", "finished", "working_on", "project_mention")
+    _MEDIA_TYPES = {"watched": "movie", "read": "book", "listened": "music"}
+
+    _PROJECT_UNION_RE = re.compile(
+        "(?P<started>%s)|(?P<finished>%s)|(?P<working_on>%s)|(?P<project_mention>%s)" % (
+            PATTERNS["started"], PATTERNS["finished"],
+            PATTERNS["working_on"], PATTERNS["project_mention"]
+        ),
+        re.IGNORECASE
+    )
+    _MEDIA_UNION_RE = re.compile(
+        "(?P<watched>%s)|(?P<read>%s)|(?P<listened>%s)" % (
+            PATTERNS["watched"], PATTERNS["read"], PATTERNS["listened"]
+        ),
+        re.IGNORECASE
+    )
+
+    # Every pattern in one alternation: extract_all scans the text once for
+    # projects, media and activities together
+    _ALL_KEYS = _PROJECT_KEYS + ("watched", "read", "listened", "activity")
+    _ALL_UNION_RE = re.compile(
+        "(?P<started>%s)|(?P<finished>%s)|(?P<working_on>%s)|(?P<project_mention>%s)"
+        "|(?P<watched>%s)|(?P<read>%s)|(?P<listened>%s)|(?P<activity>%s)" % (
+            PATTERNS["started"], PATTERNS["finished"],
+            PATTERNS["working_on"], PATTERNS["project_mention"],
+            PATTERNS["watched"], PATTERNS["read"], PATTERNS["listened"],
+            PATTERNS["activity"]
+        ),
+        re.IGNORECASE
+    )
+
     def __init__(self):
         """Initialize pattern analyzer"""
         pass
@@ -41,22 +94,23 @@ class PatternAnalyzer:
         """
         projects = []
 
-        for mention_type, pattern in self.PATTERNS.items():
-            if mention_type in ["watched", "read", "listened", "activity"]:
-                continue
-
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                project_name = match.group(1).strip()
+        for match in self._PROJECT_UNION_RE.finditer(text):
+            mention_type = next(
+                key for key in self._PROJECT_KEYS if match.group(key) is not None
+            )
+            # The name capture sits right after its named branch group
+            project_name = match.group(
+                self._PROJECT_UNION_RE.groupindex[mention_type] + 1
+            ).strip()
 
-                # Clean up the project name
-                project_name = self._clean_project_name(project_name)
+            # Clean up the project name
+            project_name = self._clean_project_name(project_name)
 
-                if project_name and len(project_name) > 2:
-                    projects.append({
-                        "name": project_name,
-                        "type": mention_type
-                    })
+            if project_name and len(project_name) > 2:
+                projects.append({
+                    "name": project_name,
+                    "type": mention_type
+                })
 
         return projects
 
@@ -69,36 +123,60 @@ class PatternAnalyzer:
         """
         media = []
 
-        media_patterns = {
-            "movie": "watched",
-            "book": "read",
-            "music": "listened"
-        }
+        for match in self._MEDIA_UNION_RE.finditer(text):
+            pattern_key = next(
+                key for key in self._MEDIA_TYPES if match.group(key) is not None
+            )
+            title = match.group(
+                self._MEDIA_UNION_RE.groupindex[pattern_key] + 1
+            ).strip()
+
+            # Clean up title
+            title = self._clean_title(title)
 
-        for media_type, pattern_key in media_patterns.items():
-            pattern = self.PATTERNS[pattern_key]
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+            if title and len(title) > 2:
+                media.append({
+                    "title": title,
+                    "type": self._MEDIA_TYPES[pattern_key]
+                })
 
-            for match in matches:
-                title = match.group(1).strip()
+        return media
+
+    def extract_all(self, text: str) -> Dict[str, List]:
+        """
+        Extract projects, media and activities in a single text scan
 
-                # Clean up title
-                title = self._clean_title(title)
+        One pass over the union of every pattern replaces the separate
+        extract_projects/extract_media/extract_activities traversals.
 
+        Returns:
+            {"projects": [...], "media": [...], "activities": [...]}
+        """
+        results = {"projects": [], "media": [], "activities": []}
+
+        for match in self._ALL_UNION_RE.finditer(text):
+            key = next(k for k in self._ALL_KEYS if match.group(k) is not None)
+            value = match.group(self._ALL_UNION_RE.groupindex[key] + 1).strip()
+
+            if key in self._MEDIA_TYPES:
+                title = self._clean_title(value)
                 if title and len(title) > 2:
-                    media.append({
-                        "title": title,
-                        "type": media_type
-                    })
+                    results["media"].append({"title": title, "type": self._MEDIA_TYPES[key]})
+            elif key == "activity":
+                if value and len(value) > 2:
+                    results["activities"].append(value)
+            else:
+                name = self._clean_project_name(value)
+                if name and len(name) > 2:
+                    results["projects"].append({"name": name, "type": key})
 
-        return media
+        return results
 
     def extract_activities(self, text: str) -> List[str]:
         """Extract activities and events"""
         activities = []
 
-        pattern = self.PATTERNS["activity"]
-        matches = re.finditer(pattern, text, re.IGNORECASE)
+        matches = self._COMPILED_PATTERNS["activity"].finditer(text)
 
         for match in matches:
             activity = match.group(1).strip()
@@ -185,24 +263,27 @@ class PatternAnalyzer:
         if not mood_history:
             return {"dominant_moods": [], "trend": "neutral"}
 
-        # Count emotions
-        emotion_counts = Counter()
-        emotion_scores = defaultdict(list)
+        # Accumulate counts and score sums into two small arrays in one pass
+        counts = np.zeros(len(EMOTIONS), dtype=np.int64)
+        sums = np.zeros(len(EMOTIONS), dtype=np.float64)
 
         for entry in mood_history:
             moods = entry.get("moods", {})
             for emotion, score in moods.items():
-                emotion_counts[emotion] += 1
-                emotion_scores[emotion].append(score)
+                i = _EMOTION_IDX.get(emotion)
+                if i is not None:
+                    counts[i] += 1
+                    sums[i] += score
 
         # Get dominant moods
+        top = np.argsort(-counts, kind="stable")[:3]
         dominant_moods = [
             {
-                "emotion": emotion,
-                "frequency": count,
-                "avg_intensity": sum(emotion_scores[emotion]) / len(emotion_scores[emotion])
+                "emotion": EMOTIONS[i],
+                "frequency": int(counts[i]),
+                "avg_intensity": float(sums[i] / counts[i])
             }
-            for emotion, count in emotion_counts.most_common(3)
+            for i in top if counts[i] > 0
         ]
 
         # Analyze trend (recent vs earlier)
@@ -274,25 +355,23 @@ class PatternAnalyzer:
     def _clean_project_name(self, name: str) -> str:
         """Clean and normalize project name"""
         # Remove common words
-        stop_words = {"the", "a", "an", "my", "this", "that", "on", "in"}
-
         words = name.split()
-        cleaned_words = [w for w in words if w.lower() not in stop_words]
+        cleaned_words = [w for w in words if w.lower() not in self._STOP_WORDS]
 
         cleaned = " ".join(cleaned_words)
 
         # Remove trailing punctuation
-        cleaned = re.sub(r'[,;:.!?]+$', '', cleaned)
+        cleaned = _TRAILING_PUNCT_RE.sub('', cleaned)
 
         return cleaned.strip()
 
     def _clean_title(self, title: str) -> str:
         """Clean media title"""
         # Remove trailing words that aren't part of title
-        title = re.sub(r'\s+(?:yesterday|today|tonight|last night|earlier).*$', '', title, flags=re.IGNORECASE)
+        title = _TITLE_TRAILER_RE.sub('', title)
 
         # Remove punctuation
-        title = re.sub(r'[,;:.!?]+$', '', title)
+        title = _TRAILING_PUNCT_RE.sub('', title)
 
         return title.strip()
 
@@ -6,12 +6,123 @@ Optimized for small 1-3B GGUF models running on CPU
 """
 
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+import hashlib
+import mmap
+import os
+import pickle
 import re
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from llama_cpp import Llama
 from llama_cpp.llama_chat_format import Llava15ChatHandler, Qwen25VLChatHandler
 
+# orjson is a drop-in C-speed encoder; fall back to stdlib json
+try:
+    import orjson
+
+    def _json_loads(data: bytes) -> Any:
+        return orjson.loads(data)
+
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _json_loads(data: bytes) -> Any:
+        return json.loads(data)
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+
+# Filename/output patterns, compiled once at import
+_QUANT_SUFFIX_RE = re.compile(r'[-_](q\d+_k_[ml]|q\d+_\d+|f16|f32)$', re.IGNORECASE)
+_SIZE_RES = (
+    (re.compile(r'(\d+\.?\d*)b[\-_]'), '{}B'),  # Matches "1b-", "3.2b-", etc.
+    (re.compile(r'[\-_](\d+\.?\d*)b'), '{}B'),  # Matches "-1b", "-3b", etc.
+)
+_QUANT_RES = (
+    re.compile(r'q\d+_k_[ml]'),  # Matches q4_k_m, q5_k_m, etc.
+    re.compile(r'q\d+_\d+'),     # Matches q4_0, q8_0, etc.
+    re.compile(r'f16'),          # Matches f16
+    re.compile(r'f32')           # Matches f32
+)
+_THINK_RE = re.compile(r'<think>.*?</think>', re.IGNORECASE | re.DOTALL)
+_COMPLEX_RE = re.compile(r'\b(?:why|how|explain|describe|analyze|discuss|compare)\b')
+
+# Per-response stdout chatter costs real time under load - opt in to it
+_DEBUG = os.environ.get("DIARYML_DEBUG") == "1"
+
+# Filename keyword tables (module-level tuples - built once, scanned fast)
+_VISION_KEYWORDS = (
+    'vl',           # Vision-Language
+    'vision',       # Explicit vision marker
+    'llava',        # LLaVA models
+    'qwen-vl',      # Qwen Vision-Language
+    'qwen2-vl',     # Qwen2 Vision-Language
+    'qwen3-vl',     # Qwen3 Vision-Language
+    'qwen2vl',      # Alternative naming
+    'qwen3vl',      # Alternative naming
+    'qwenvl',       # Alternative naming
+    'minicpm-v',    # MiniCPM Vision
+    'lfm-vl',       # LFM Vision-Language
+    'lfm2-vl',      # LFM2 Vision-Language
+)
+_TEXT_ONLY_KEYWORDS = (
+    'ameba',        # Ameba models are text-only
+    'jamba',        # Jamba models are text-only
+    'reasoning',    # Reasoning models are typically text-only
+    'moe',          # MoE models are typically text-only (unless explicitly VL)
+)
+_QWEN_VL_KEYWORDS = ('qwen-vl', 'qwen2-vl', 'qwen3-vl', 'qwen2vl', 'qwen3vl', 'qwenvl')
+_THINKING_KEYWORDS = ('reasoning', 'think', 'jamba', 'chain', 'cot', 'moe')
+
+STATIC_SYSTEM_PROMPT = """You are DiaryML, a private creative companion and emotional mirror.
+You help your user reflect, create, and explore their inner world through journaling.
+
+Your role is to:
+- Be emotionally attuned and respond to the user's current mood
+- Remember past projects, activities, and patterns
+- Offer creative suggestions and gentle nudges
+- Help capture emotions that words alone cannot express
+- Be a supportive partner in the user's artistic journey
+
+Respond with warmth, insight, and creativity. Keep responses concise but meaningful.
+IMPORTANT: Provide direct responses without showing your reasoning process or explaining how you arrived at your answer."""
+
+
+def _safe_truncate(text: str, max_bytes: int) -> str:
+    """Truncate to a byte budget without splitting a UTF-8 sequence -
+    mangled tail bytes become <unk> tokens that waste context"""
+    return text.encode('utf-8')[:max_bytes].decode('utf-8', errors='ignore')
+
+
+def _optimal_threads() -> int:
+    """
+    Pick the inference thread count: physical cores, capped at 16
+
+    CPU LLM inference is memory-bandwidth-bound and SIMD-heavy, so
+    hyperthreads fight over the same FMA units - logical-core defaults
+    (llama.cpp's n_threads=None) actively hurt. DIARYML_THREADS overrides.
+    """
+    env_threads = os.environ.get("DIARYML_THREADS")
+    if env_threads:
+        try:
+            return max(1, int(env_threads))
+        except ValueError:
+            print(f"Warning: ignoring invalid DIARYML_THREADS={env_threads!r}")
+
+    try:
+        import psutil
+        physical = psutil.cpu_count(logical=False)
+    except ImportError:
+        physical = None
+
+    if not physical:
+        physical = max(1, (os.cpu_count() or 2) // 2)
+
+    return min(physical, 16)
+
 
 class QwenInterface:
     """
@@ -22,6 +133,15 @@ class QwenInterface:
     - Text-only models (Jamba, Llama, etc.)
     """
 
+    # Fixed attribute layout: smaller instances and C-offset attribute
+    # access on the per-token hot path
+    __slots__ = (
+        'model_dir', 'config_dir', 'has_vision', 'is_thinking_model',
+        'model_info', 'model_path', 'vision_handler_type', 'chat_handler',
+        'llm', '_size_num', '_max_cap', '_train_ctx', '_ctx',
+        '_static_sys_tokens', '_postprocess', '_generate_lock'
+    )
+
     def __init__(self, model_path: Optional[Path] = None, mmproj_path: Optional[Path] = None):
         """
         Initialize AI model (supports both vision and text-only models)
@@ -32,6 +152,12 @@ class QwenInterface:
         """
         self.model_dir = Path(__file__).parent.parent / "models"
         self.config_dir = Path(__file__).parent.parent
+
+        # One Llama context serves every caller; llama.cpp contexts are not
+        # thread-safe, so concurrent turns queue here. True multi-user
+        # parallel decoding (per-sequence KV slots) belongs in llama.cpp's
+        # server mode with n_parallel, not in this embedded interface.
+        self._generate_lock = threading.Lock()
         self.has_vision = False
         self.is_thinking_model = False
         self.model_info = {}
@@ -54,20 +180,29 @@ class QwenInterface:
         # Analyze model filename to detect capabilities
         self._analyze_model_name(model_path)
 
+        # Refine the filename guesses with the GGUF header when possible
+        self._probe_gguf_metadata(model_path)
+
+        # Non-thinking models skip the reasoning cleanup entirely
+        self._postprocess = (
+            self._clean_reasoning_output if self.is_thinking_model else self._identity
+        )
+
         # Determine if we should use vision support
         # Only attempt to load mmproj if the model is actually a vision-language model
         self.vision_handler_type = None
+        is_vision, handler_type = self._detect_vision(model_path)
         if mmproj_path is not None:
             # mmproj explicitly provided - use it
             self.has_vision = True
-            self.vision_handler_type = self._get_vision_handler_type(model_path)
+            self.vision_handler_type = handler_type
             print(f"Using explicitly provided mmproj: {mmproj_path}")
-        elif self._is_vision_model(model_path):
+        elif is_vision:
             # Vision model detected - try to find mmproj automatically
             try:
                 mmproj_path = self._find_mmproj_file()
                 self.has_vision = True
-                self.vision_handler_type = self._get_vision_handler_type(model_path)
+                self.vision_handler_type = handler_type
                 print(f"Auto-detected vision model - found mmproj: {mmproj_path.name}")
                 print(f"Vision architecture: {self.vision_handler_type}")
             except FileNotFoundError:
@@ -86,46 +221,85 @@ class QwenInterface:
 
         # Determine optimal context window based on model size
         recommended_ctx = self._get_recommended_context()
+        self._ctx = recommended_ctx
         print(f"Using context window: {recommended_ctx} tokens")
 
+        # Force the model's pages into the page cache up front so first-token
+        # latency doesn't absorb lazy mmap faults
+        self._prefault_model()
+
         try:
             # Initialize with or without vision support
             if self.has_vision:
                 # Vision-language model - use appropriate chat handler
                 if self.vision_handler_type == 'qwen':
                     print("Using Qwen25VLChatHandler for Qwen-VL model")
-                    self.chat_handler = Qwen25VLChatHandler(clip_model_path=str(mmproj_path))
+                    handler_cls = Qwen25VLChatHandler
                 elif self.vision_handler_type == 'llava':
                     print("Using Llava15ChatHandler for LLaVA model")
-                    self.chat_handler = Llava15ChatHandler(clip_model_path=str(mmproj_path))
+                    handler_cls = Llava15ChatHandler
                 elif self.vision_handler_type == 'minicpm':
                     print("Using Qwen25VLChatHandler as fallback for MiniCPM-V")
-                    self.chat_handler = Qwen25VLChatHandler(clip_model_path=str(mmproj_path))
+                    handler_cls = Qwen25VLChatHandler
                 else:
                     print(f"Unknown vision model type, trying Qwen25VLChatHandler as fallback")
-                    self.chat_handler = Qwen25VLChatHandler(clip_model_path=str(mmproj_path))
-
-                self.llm = Llama(
-                    model_path=str(model_path),
-                    chat_handler=self.chat_handler,
-                    n_ctx=recommended_ctx,
-                    n_gpu_layers=0,  # CPU only
-                    verbose=False,
-                    n_threads=None  # Auto-detect
-                )
+                    handler_cls = Qwen25VLChatHandler
+
+                # The CLIP projector and the LLM weights are independent
+                # disk-bound loads - overlap them
+                n_threads = _optimal_threads()
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    clip_future = executor.submit(
+                        handler_cls, clip_model_path=str(mmproj_path)
+                    )
+                    llm_future = executor.submit(
+                        Llama,
+                        model_path=str(model_path),
+                        n_ctx=recommended_ctx,
+                        n_batch=2048,  # Large prefill batches - one wide GEMM
+                        n_ubatch=512,
+                        n_gpu_layers=0,  # CPU only
+                        verbose=False,
+                        n_threads=n_threads,  # Physical cores - avoid SMT contention
+                        n_threads_batch=n_threads
+                    )
+                    self.chat_handler = clip_future.result()
+                    self.llm = llm_future.result()
+
+                # Attach the handler (the constructor arg would have forced
+                # the loads to run sequentially)
+                self.llm.chat_handler = self.chat_handler
                 print("✓ Vision-language model loaded successfully")
             else:
                 # Text-only model - optimized for CPU
                 self.chat_handler = None
+                n_threads = _optimal_threads()
+
+                # Opt-in: reflective diary replies often quote the prompt,
+                # which is exactly what prompt-lookup decoding accelerates.
+                # Off by default since it can regress on low-overlap chats.
+                draft_model = None
+                if os.environ.get("DIARYML_SPECULATIVE") == "1":
+                    try:
+                        from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+                        draft_model = LlamaPromptLookupDecoding(num_pred_tokens=3)
+                        print("✓ Prompt-lookup speculative decoding enabled")
+                    except Exception as e:
+                        print(f"Note: speculative decoding unavailable: {e}")
+
                 self.llm = Llama(
                     model_path=str(model_path),
                     n_ctx=recommended_ctx,
-                    n_batch=min(512, recommended_ctx // 4),  # Batch size proportional to context
+                    n_batch=2048,  # Large prefill batches - one wide GEMM
+                    n_ubatch=512,
                     n_gpu_layers=0,  # CPU only
                     verbose=False,
-                    n_threads=None,  # Auto-detect optimal thread count
+                    n_threads=n_threads,  # Physical cores - avoid SMT contention
+                    n_threads_batch=n_threads,
                     use_mmap=True,  # Memory-map the model for faster loading
-                    use_mlock=False  # Don't lock memory (allows swapping if needed)
+                    use_mlock=self._can_mlock(),  # Pin pages when they fit in RAM
+                    draft_model=draft_model,
+                    logits_all=draft_model is not None
                 )
                 print("✓ Text-only model loaded successfully")
                 print(f"Model info: {self.model_info.get('size', 'unknown')} parameters, {self.model_info.get('quantization', 'unknown')} quantization")
@@ -143,6 +317,78 @@ class QwenInterface:
             print("You just won't have AI chat until the model loads.\n")
             raise
 
+        # Tokenize the static prompt once - its token count feeds the
+        # context budget, and the identical byte prefix (chunk3-14) means
+        # the runtime's prefix cache never re-prefills it
+        try:
+            self._static_sys_tokens = self.llm.tokenize(
+                STATIC_SYSTEM_PROMPT.encode('utf-8'), add_bos=False
+            )
+        except Exception:
+            self._static_sys_tokens = []
+
+        # Restore (or build) the prefilled system-prompt KV state so the
+        # first interaction after launch skips the static prefill
+        self._warm_start()
+
+    def _can_mlock(self) -> bool:
+        """Lock model pages only when they comfortably fit in available RAM"""
+        try:
+            import psutil
+            available = psutil.virtual_memory().available
+        except ImportError:
+            return False
+
+        return available > self.model_path.stat().st_size * 1.3
+
+    def _prefault_model(self):
+        """Touch one byte per page of the GGUF to force eager residency"""
+        import mmap
+
+        try:
+            with open(self.model_path, "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                page_size = mmap.PAGESIZE
+                for offset in range(0, len(mm), page_size):
+                    mm[offset]
+        except Exception as e:
+            print(f"Note: model prefault skipped: {e}")
+
+    def _warm_start(self):
+        """Prime the KV cache with the static system prompt, persisting the
+        warmed state to disk keyed by model file and prompt content"""
+        state_file = self.model_dir / f"{self.model_path.stem}.kvstate"
+        state_key = hashlib.sha256(
+            f"{self.model_path.name}:{self.model_path.stat().st_mtime_ns}:".encode()
+            + STATIC_SYSTEM_PROMPT.encode()
+        ).hexdigest()
+
+        try:
+            if state_file.exists():
+                with open(state_file, "rb") as f:
+                    saved = pickle.load(f)
+                if saved.get("key") == state_key:
+                    self.llm.load_state(saved["state"])
+                    print("✓ Restored warmed KV state from previous run")
+                    return
+        except Exception as e:
+            print(f"Note: could not restore KV state: {e}")
+
+        try:
+            # Prefill the canonical system prompt once and save the state
+            self.llm.create_chat_completion(
+                messages=[
+                    {"role": "system", "content": STATIC_SYSTEM_PROMPT},
+                    {"role": "user", "content": "Hello"}
+                ],
+                max_tokens=1
+            )
+            with open(state_file, "wb") as f:
+                pickle.dump({"key": state_key, "state": self.llm.save_state()}, f)
+            print("✓ Warmed KV state saved for faster future launches")
+        except Exception as e:
+            print(f"Note: KV warmup skipped: {e}")
+
     def _load_model_preference(self) -> Optional[Path]:
         """Load the saved model preference from config file"""
         config_file = self.config_dir / "model_config.json"
@@ -151,14 +397,17 @@ class QwenInterface:
             return None
 
         try:
-            with open(config_file, 'r') as f:
-                config = json.load(f)
-                model_filename = config.get('last_model')
-
-                if model_filename:
-                    model_path = self.model_dir / model_filename
-                    if model_path.exists():
-                        return model_path
+            # mmap skips the kernel->userspace copy of a buffered read
+            with open(config_file, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                config = _json_loads(bytes(mm))
+
+            model_filename = config.get('last_model')
+
+            if model_filename:
+                model_path = self.model_dir / model_filename
+                if model_path.exists():
+                    return model_path
         except Exception as e:
             print(f"Warning: Could not load model preference: {e}")
 
@@ -174,8 +423,8 @@ class QwenInterface:
                 'last_updated': str(Path(__file__).stat().st_mtime)
             }
 
-            with open(config_file, 'w') as f:
-                json.dump(config, f, indent=2)
+            with open(config_file, 'wb') as f:
+                f.write(_json_dumps(config))
 
             print(f"✓ Saved model preference: {self.model_path.name}")
         except Exception as e:
@@ -193,7 +442,7 @@ class QwenInterface:
         name = filename.replace('.gguf', '')
 
         # Try to remove quantization suffix (q4_k_m, q5_k_m, etc.)
-        name = re.sub(r'[-_](q\d+_k_[ml]|q\d+_\d+|f16|f32)$', '', name, flags=re.IGNORECASE)
+        name = _QUANT_SUFFIX_RE.sub('', name)
 
         # If name is still too long, just return first 40 chars
         if len(name) > 40:
@@ -201,8 +450,44 @@ class QwenInterface:
 
         return name
 
+    def _cached_model_choice(self) -> Optional[Path]:
+        """Return the previously scanned model if the directory is unchanged"""
+        cache_file = self.model_dir / ".model_cache.json"
+
+        try:
+            if cache_file.exists():
+                cached = _json_loads(cache_file.read_bytes())
+                if cached.get("dir_mtime") == self.model_dir.stat().st_mtime_ns:
+                    cached_path = self.model_dir / cached.get("model", "")
+                    if cached_path.is_file():
+                        print(f"Using cached model selection: {cached_path.name}")
+                        return cached_path
+        except Exception:
+            pass
+
+        return None
+
+    def _remember_model_choice(self, model_path: Path):
+        """Persist the scan result keyed by the directory's mtime"""
+        cache_file = self.model_dir / ".model_cache.json"
+
+        try:
+            cache_file.write_bytes(_json_dumps({"model": model_path.name, "dir_mtime": 0}))
+            # Stat after writing - creating the sidecar bumps the dir mtime
+            cache_file.write_bytes(_json_dumps({
+                "model": model_path.name,
+                "dir_mtime": self.model_dir.stat().st_mtime_ns
+            }))
+        except Exception:
+            pass
+
     def _find_model_file(self) -> Path:
         """Auto-detect the main model GGUF file"""
+        # Skip the scan entirely when the directory hasn't changed
+        cached = self._cached_model_choice()
+        if cached is not None:
+            return cached
+
         # Try specific names first (manually downloaded)
         known_files = [
             "nsfw-ameba-3.2-1b-q5_k_m.gguf",
@@ -211,35 +496,51 @@ class QwenInterface:
             "huihui-qwen3-vl-2b-instruct-abliterated-q4_k_m.gguf"
         ]
 
+        # One directory scan (one stat per file); every pattern below is
+        # then matched in memory instead of re-globbing the directory
+        try:
+            with os.scandir(self.model_dir) as entries:
+                ggufs = [
+                    (entry.name, entry.stat().st_size)
+                    for entry in entries
+                    if entry.is_file()
+                    and entry.name.endswith(".gguf")
+                    and "mmproj" not in entry.name.lower()
+                ]
+        except FileNotFoundError:
+            ggufs = []
+
+        names = {name for name, _ in ggufs}
         for filename in known_files:
-            filepath = self.model_dir / filename
-            if filepath.exists():
+            if filename in names:
                 print(f"Found known model: {filename}")
-                return filepath
+                chosen = self.model_dir / filename
+                self._remember_model_choice(chosen)
+                return chosen
 
         # Fallback to pattern matching - prioritize smaller quantized models
-        patterns = [
-            "*1b*.gguf",      # 1B models (fastest)
-            "*2b*.gguf",      # 2B models
-            "*3b*.gguf",      # 3B models
-            "*ameba*.gguf",   # Ameba series
-            "*jamba*.gguf",   # Jamba series
-            "*qwen*.gguf",    # Qwen series
-            "ggml-model*.gguf",  # Generic GGUF
-            "*q5_k_m.gguf",   # Q5 quantization
-            "*q4_k_m.gguf",   # Q4 quantization
-            "*.gguf"          # Any GGUF file
+        matchers = [
+            lambda n: "1b" in n,                 # 1B models (fastest)
+            lambda n: "2b" in n,                 # 2B models
+            lambda n: "3b" in n,                 # 3B models
+            lambda n: "ameba" in n,              # Ameba series
+            lambda n: "jamba" in n,              # Jamba series
+            lambda n: "qwen" in n,               # Qwen series
+            lambda n: n.startswith("ggml-model"),  # Generic GGUF
+            lambda n: n.endswith("q5_k_m.gguf"),   # Q5 quantization
+            lambda n: n.endswith("q4_k_m.gguf"),   # Q4 quantization
+            lambda n: True                       # Any GGUF file
         ]
 
-        for pattern in patterns:
-            files = list(self.model_dir.glob(pattern))
-            # Exclude mmproj files
-            files = [f for f in files if "mmproj" not in f.name.lower()]
+        for matcher in matchers:
+            files = [(name, size) for name, size in ggufs if matcher(name.lower())]
             if files:
                 # Sort by file size (smaller = faster) if multiple matches
-                files.sort(key=lambda f: f.stat().st_size)
-                print(f"Auto-detected model: {files[0].name}")
-                return files[0]
+                files.sort(key=lambda f: f[1])
+                print(f"Auto-detected model: {files[0][0]}")
+                chosen = self.model_dir / files[0][0]
+                self._remember_model_choice(chosen)
+                return chosen
 
         raise FileNotFoundError(
             f"No GGUF model file found in {self.model_dir}. "
@@ -250,9 +551,9 @@ class QwenInterface:
             f"  - 3B models (best quality): AI21-Jamba-Reasoning-3B-Q4_K_M.gguf"
         )
 
-    def _is_vision_model(self, model_path: Path) -> bool:
+    def _detect_vision(self, model_path: Path) -> Tuple[bool, str]:
         """
-        Detect if a model is a vision-language model based on filename patterns
+        Detect vision capability and chat-handler type in one filename pass
 
         Supports multiple VL architectures:
         - LLaVA (via Llava15ChatHandler)
@@ -263,75 +564,36 @@ class QwenInterface:
             model_path: Path to the model file
 
         Returns:
-            True if this appears to be a vision-language model
+            (is_vision, handler_type) where handler_type is one of
+            'qwen', 'llava', 'minicpm', or 'unknown'
         """
         filename = model_path.name.lower()
 
-        # Vision model indicators
-        vision_keywords = [
-            'vl',           # Vision-Language
-            'vision',       # Explicit vision marker
-            'llava',        # LLaVA models
-            'qwen-vl',      # Qwen Vision-Language
-            'qwen2-vl',     # Qwen2 Vision-Language
-            'qwen3-vl',     # Qwen3 Vision-Language
-            'qwen2vl',      # Alternative naming
-            'qwen3vl',      # Alternative naming
-            'qwenvl',       # Alternative naming
-            'minicpm-v',    # MiniCPM Vision
-            'lfm-vl',       # LFM Vision-Language
-            'lfm2-vl',      # LFM2 Vision-Language
-        ]
-
         # Check if any vision keyword is in the filename
-        is_vision = any(keyword in filename for keyword in vision_keywords)
-
-        # Text-only model indicators (override vision detection if found)
-        text_only_keywords = [
-            'ameba',        # Ameba models are text-only
-            'jamba',        # Jamba models are text-only
-            'reasoning',    # Reasoning models are typically text-only
-            'moe',          # MoE models are typically text-only (unless explicitly VL)
-        ]
+        is_vision = any(keyword in filename for keyword in _VISION_KEYWORDS)
 
         # If text-only markers found, it's likely not a vision model
         # (unless it explicitly says VL/vision)
-        has_text_marker = any(keyword in filename for keyword in text_only_keywords)
-
-        if has_text_marker and not is_vision:
-            return False
-
-        return is_vision
-
-    def _get_vision_handler_type(self, model_path: Path) -> str:
-        """
-        Determine which vision chat handler to use based on model architecture
-
-        Args:
-            model_path: Path to the model file
-
-        Returns:
-            One of: 'qwen', 'llava', 'minicpm', or 'unknown'
-        """
-        filename = model_path.name.lower()
+        if not is_vision and any(keyword in filename for keyword in _TEXT_ONLY_KEYWORDS):
+            return False, 'unknown'
 
         # Qwen-VL models
-        if any(kw in filename for kw in ['qwen-vl', 'qwen2-vl', 'qwen3-vl', 'qwen2vl', 'qwen3vl', 'qwenvl']):
-            return 'qwen'
+        if any(kw in filename for kw in _QWEN_VL_KEYWORDS):
+            return is_vision, 'qwen'
 
         # LLaVA models
         if 'llava' in filename:
-            return 'llava'
+            return is_vision, 'llava'
 
         # MiniCPM models
         if 'minicpm-v' in filename:
-            return 'minicpm'
+            return is_vision, 'minicpm'
 
         # LFM models (might work with Qwen handler - experimental)
         if 'lfm-vl' in filename or 'lfm2-vl' in filename:
-            return 'qwen'  # Try Qwen handler as fallback
+            return is_vision, 'qwen'  # Try Qwen handler as fallback
 
-        return 'unknown'
+        return is_vision, 'unknown'
 
     def _find_mmproj_file(self) -> Path:
         """Auto-detect the mmproj vision file"""
@@ -361,13 +623,8 @@ class QwenInterface:
         filename = model_path.name.lower()
 
         # Detect model size (1B, 2B, 3B, etc.)
-        size_patterns = [
-            (r'(\d+\.?\d*)b[\-_]', '{}B'),  # Matches "1b-", "3.2b-", etc.
-            (r'[\-_](\d+\.?\d*)b', '{}B'),  # Matches "-1b", "-3b", etc.
-        ]
-
-        for pattern, format_str in size_patterns:
-            match = re.search(pattern, filename)
+        for pattern, format_str in _SIZE_RES:
+            match = pattern.search(filename)
             if match:
                 size_num = match.group(1)
                 self.model_info['size'] = format_str.format(size_num)
@@ -380,15 +637,8 @@ class QwenInterface:
             self.model_info['size_num'] = 2.0  # Assume 2B as default
 
         # Detect quantization level (Q4_K_M, Q5_K_M, F16, etc.)
-        quant_patterns = [
-            r'q\d+_k_[ml]',  # Matches q4_k_m, q5_k_m, etc.
-            r'q\d+_\d+',     # Matches q4_0, q8_0, etc.
-            r'f16',          # Matches f16
-            r'f32'           # Matches f32
-        ]
-
-        for pattern in quant_patterns:
-            match = re.search(pattern, filename)
+        for pattern in _QUANT_RES:
+            match = pattern.search(filename)
             if match:
                 self.model_info['quantization'] = match.group(0).upper()
                 break
@@ -397,15 +647,69 @@ class QwenInterface:
             self.model_info['quantization'] = 'unknown'
 
         # Detect if this is a thinking/reasoning model
-        thinking_keywords = ['reasoning', 'think', 'jamba', 'chain', 'cot', 'moe']
-        self.is_thinking_model = any(keyword in filename for keyword in thinking_keywords)
+        self.is_thinking_model = any(keyword in filename for keyword in _THINKING_KEYWORDS)
+
+        # Precompute the hot-path attributes _calculate_response_length reads
+        # on every user turn (plain attributes, no dict lookups or cascades)
+        self._size_num = self.model_info['size_num']
+        if self._size_num <= 1.5:  # 1B models
+            max_cap = 2048
+        elif self._size_num <= 2.5:  # 2B models
+            max_cap = 3072
+        else:  # 3B+ models
+            max_cap = 4096
+
+        # For thinking models, allow even more tokens for reasoning
+        if self.is_thinking_model:
+            max_cap = min(max_cap + 1024, 8192)
+
+        self._max_cap = max_cap
+
+    def _probe_gguf_metadata(self, model_path: Path):
+        """
+        Read true parameter count and training context from the GGUF header
+
+        Filename regexes guess "2B" for unknown files; a wrong guess picks a
+        context window the model wasn't trained for (and context overflow
+        reallocation inside llama.cpp is very expensive). Falls back to the
+        filename heuristics when the gguf package isn't available.
+        """
+        self._train_ctx: Optional[int] = None
+
+        try:
+            from gguf import GGUFReader
+
+            reader = GGUFReader(str(model_path))
+
+            def scalar(key):
+                field = reader.fields.get(key)
+                if field is None:
+                    return None
+                return field.parts[field.data[0]][0]
+
+            param_count = scalar('general.parameter_count')
+            if param_count:
+                self._size_num = float(param_count) / 1e9
+                self.model_info['size_num'] = self._size_num
+                self.model_info['size'] = f"{self._size_num:.1f}B"
+
+            arch_field = reader.fields.get('general.architecture')
+            if arch_field is not None:
+                arch = bytes(arch_field.parts[arch_field.data[0]]).decode()
+                train_ctx = scalar(f'{arch}.context_length')
+                if train_ctx:
+                    self._train_ctx = int(train_ctx)
+        except ImportError:
+            pass  # gguf package not installed - keep filename heuristics
+        except Exception as e:
+            print(f"Note: GGUF metadata probe failed: {e}")
 
     def _get_recommended_context(self) -> int:
         """
         Get recommended context window size based on model size and quantization
         Large contexts (~30k tokens) for rich diary context and conversation history
         """
-        size_num = self.model_info.get('size_num', 2.0)
+        size_num = self._size_num
         quant = self.model_info.get('quantization', 'Q4_K_M')
 
         # Large context recommendations for diary/journaling use case
@@ -431,6 +735,10 @@ class QwenInterface:
         if self.is_thinking_model:
             base_ctx = min(base_ctx + 4096, 65536)
 
+        # Never exceed what the model was trained for
+        if self._train_ctx:
+            base_ctx = min(base_ctx, self._train_ctx)
+
         return base_ctx
 
     def _calculate_response_length(self, user_message: str) -> int:
@@ -445,22 +753,17 @@ class QwenInterface:
         Returns:
             Recommended max_tokens value
         """
-        # Count words and sentences
-        words = user_message.split()
-        word_count = len(words)
-        sentences = re.split(r'[.!?]+', user_message)
-        sentence_count = len([s for s in sentences if s.strip()])
+        # One lowercase copy and single C-level scans - the old version
+        # walked the message half a dozen times (including a sentence split
+        # whose result was never used)
+        word_count = len(user_message.split())
 
         # Check for question marks (questions need more thorough answers)
-        has_question = '?' in user_message
         question_count = user_message.count('?')
+        has_question = question_count > 0
 
         # Check for complexity indicators
-        complex_words = ['why', 'how', 'explain', 'describe', 'analyze', 'discuss', 'compare']
-        is_complex = any(word in user_message.lower() for word in complex_words)
-
-        # Base token count - much larger than before
-        base_tokens = 800
+        is_complex = _COMPLEX_RE.search(user_message.lower()) is not None
 
         # Adjust based on input length
         if word_count < 10:
@@ -484,21 +787,9 @@ class QwenInterface:
         if is_complex:
             tokens += 512
 
-        # Cap based on model size - much higher caps now
-        size_num = self.model_info.get('size_num', 2.0)
-        if size_num <= 1.5:  # 1B models
-            max_cap = 2048  # Was 300, now 2048
-        elif size_num <= 2.5:  # 2B models
-            max_cap = 3072  # Was 400, now 3072
-        else:  # 3B+ models
-            max_cap = 4096  # Was 512, now 4096
-
-        # For thinking models, allow even more tokens for reasoning
-        if self.is_thinking_model:
-            max_cap = min(max_cap + 1024, 8192)
-
-        # Ensure we're within reasonable bounds
-        tokens = max(512, min(tokens, max_cap))
+        # Ensure we're within reasonable bounds (cap precomputed at init
+        # from model size and thinking flag)
+        tokens = max(512, min(tokens, self._max_cap))
 
         return tokens
 
@@ -509,8 +800,9 @@ class QwenInterface:
         past_context: Optional[List[str]] = None,
         image_path: Optional[str] = None,
         max_tokens: Optional[int] = None,  # Auto-detect if None
-        temperature: float = 0.7
-    ) -> str:
+        temperature: float = 0.7,
+        stream: bool = False
+    ) -> Any:
         """
         Generate AI response with mood and context awareness
 
@@ -521,22 +813,31 @@ class QwenInterface:
             image_path: Optional path to image attached to entry
             max_tokens: Maximum response length (auto-detected if None)
             temperature: Creativity (0.0-1.0, higher = more creative)
+            stream: Yield text pieces as they are generated instead of
+                    buffering the full response. Streamed text is NOT run
+                    through the reasoning cleanup - thinking models stream
+                    their raw <think> blocks (only a closing </output> tag
+                    is withheld); callers wanting cleaned output should use
+                    the buffered path.
 
         Returns:
-            AI-generated response string
+            AI-generated response string, or a generator of text pieces
+            when stream=True
         """
         # Auto-detect optimal response length if not specified
         if max_tokens is None:
             max_tokens = self._calculate_response_length(user_message)
 
-        # Build system prompt with mood awareness
-        system_prompt = self._build_system_prompt(mood_context, past_context)
+        # Build messages: the static persona goes first and stays
+        # byte-identical across turns so llama.cpp's prefix cache reuses its
+        # KV state; the changing mood/context lives in a second message
+        messages = [{"role": "system", "content": STATIC_SYSTEM_PROMPT}]
 
-        # Build messages
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ]
+        dynamic_context = self._build_system_prompt(mood_context, past_context)
+        if dynamic_context:
+            messages.append({"role": "system", "content": dynamic_context})
+
+        messages.append({"role": "user", "content": user_message})
 
         # Add image if provided and model supports vision
         if image_path and self.has_vision:
@@ -548,37 +849,88 @@ class QwenInterface:
             # Text-only model - just mention the image exists
             messages[-1]["content"] = user_message + "\n\n[Note: Image attached but model doesn't support vision analysis]"
 
-        # Generate response
-        response = self.llm.create_chat_completion(
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature
-        )
+        # Stream pieces to the caller as they are generated
+        if stream:
+            return self._stream_response(messages, max_tokens, temperature)
+
+        # Generate response. For reasoning models, halt at the closing
+        # output tag - trailing tokens after it are stripped anyway.
+        # (Stopping at </think> would discard the answer that follows it.)
+        with self._generate_lock:
+            response = self.llm.create_chat_completion(
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stop=["</output>"] if self.is_thinking_model else None
+            )
 
         content = response["choices"][0]["message"]["content"]
 
         # Clean up reasoning model output if needed
-        return self._clean_reasoning_output(content)
+        return self._postprocess(content)
+
+    @staticmethod
+    def _identity(content: str) -> str:
+        """Pass-through installed for non-reasoning models"""
+        return content
+
+    def _stream_response(self, messages: List[Dict], max_tokens: int, temperature: float):
+        """
+        Yield response text pieces as the model produces them
+
+        A closing </output> tag ends the stream without being yielded
+        (a possible tag prefix is held back until the next piece decides
+        it). No other reasoning cleanup is applied - see generate_response.
+        """
+        stop_tag = "</output>"
+        buffer = ""
+
+        with self._generate_lock:
+            for chunk in self.llm.create_chat_completion(
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            ):
+                delta = chunk["choices"][0]["delta"].get("content")
+                if not delta:
+                    continue
+
+                buffer += delta
+
+                # Everything from the closing tag on is discarded filler
+                tag_at = buffer.find(stop_tag)
+                if tag_at != -1:
+                    if tag_at:
+                        yield buffer[:tag_at]
+                    return
+
+                # Hold back whatever could still turn into the tag
+                held = 0
+                for k in range(min(len(stop_tag) - 1, len(buffer)), 0, -1):
+                    if buffer.endswith(stop_tag[:k]):
+                        held = k
+                        break
+
+                if len(buffer) > held:
+                    yield buffer[:len(buffer) - held]
+                    buffer = buffer[len(buffer) - held:]
+
+        if buffer:
+            yield buffer
 
     def _build_system_prompt(
         self,
         mood_context: Optional[Dict[str, float]],
         past_context: Optional[List[str]]
     ) -> str:
-        """Build system prompt with mood and context awareness"""
-
-        prompt = """You are DiaryML, a private creative companion and emotional mirror.
-You help your user reflect, create, and explore their inner world through journaling.
-
-Your role is to:
-- Be emotionally attuned and respond to the user's current mood
-- Remember past projects, activities, and patterns
-- Offer creative suggestions and gentle nudges
-- Help capture emotions that words alone cannot express
-- Be a supportive partner in the user's artistic journey
+        """
+        Build the dynamic mood/context system message
 
-Respond with warmth, insight, and creativity. Keep responses concise but meaningful.
-IMPORTANT: Provide direct responses without showing your reasoning process or explaining how you arrived at your answer."""
+        The static persona lives in STATIC_SYSTEM_PROMPT and is sent as its
+        own unchanging message; only this tail varies between turns.
+        """
+        prompt = ""
 
         # Add mood context
         if mood_context:
@@ -596,13 +948,42 @@ IMPORTANT: Provide direct responses without showing your reasoning process or ex
             elif dominant_mood in ["anger", "frustration"]:
                 prompt += "\nBe understanding and help them process these feelings."
 
-        # Add relevant past context (truncated to save tokens)
+        # Add relevant past context, budgeted by tokens rather than a blind
+        # 100-character slice - the 24-32k context has room for far more
         if past_context:
-            prompt += "\n\nRelevant past entry:"
-            # Only include first entry, truncated to 100 chars
-            prompt += f"\n{past_context[0][:100]}..."
+            prompt += "\n\nRelevant past entries:"
+            prompt += self._pack_past_context(past_context)
 
-        return prompt
+        return prompt.lstrip("\n")
+
+    def _pack_past_context(self, past_context: List[str]) -> str:
+        """Pack as many past entries as fit a quarter-context token budget,
+        truncating the last one at a token boundary"""
+        budget = max(256, self._ctx // 4 - len(self._static_sys_tokens))
+        parts = []
+
+        try:
+            for entry in past_context:
+                tokens = self.llm.tokenize(entry.encode('utf-8'), add_bos=False)
+
+                if len(tokens) <= budget:
+                    parts.append(entry)
+                    budget -= len(tokens)
+                else:
+                    truncated = self.llm.detokenize(tokens[:budget]).decode(
+                        'utf-8', errors='replace'
+                    )
+                    parts.append(truncated + "...")
+                    break
+
+                if budget <= 0:
+                    break
+        except Exception as e:
+            # Tokenizer unavailable - keep a rough byte-budget fallback
+            print(f"Note: token-budgeted context packing failed: {e}")
+            parts = [_safe_truncate(entry, 400) for entry in past_context[:3]]
+
+        return "".join(f"\n{part}" for part in parts)
 
     def _clean_reasoning_output(self, content: str) -> str:
         """
@@ -613,7 +994,7 @@ IMPORTANT: Provide direct responses without showing your reasoning process or ex
         - Others: Answer:, Response:, etc.
         """
         # First, let's see what we're getting (debug)
-        if len(content) > 200:
+        if _DEBUG and len(content) > 200:
             print(f"\n=== RAW MODEL OUTPUT (first 500 chars) ===")
             print(content[:500])
             print(f"=== END RAW OUTPUT ===\n")
@@ -621,12 +1002,10 @@ IMPORTANT: Provide direct responses without showing your reasoning process or ex
         # Pattern 1: Remove <think>...</think> blocks (Qwen MOE models)
         if '<think>' in content.lower():
             # Remove everything between <think> and </think> (case insensitive)
-            import re
-            # Match <think> or <THINK> with optional whitespace
-            cleaned = re.sub(r'<think>.*?</think>', '', content, flags=re.IGNORECASE | re.DOTALL)
-            cleaned = cleaned.strip()
+            cleaned = _THINK_RE.sub('', content).strip()
             if cleaned:  # Make sure we have content left
-                print("Removed <think> blocks from output")
+                if _DEBUG:
+                    print("Removed <think> blocks from output")
                 return cleaned
 
         # Pattern 2: Look for explicit answer markers and tags
@@ -638,14 +1017,16 @@ IMPORTANT: Provide direct responses without showing your reasoning process or ex
                     # Remove closing tag if present
                     if '</output>' in result:
                         result = result.split('</output>')[0].strip()
-                    print(f"Extracted using marker '{marker}'")
+                    if _DEBUG:
+                        print(f"Extracted using marker '{marker}'")
                     return result
 
         # Try pattern 2: Look for content after triple newlines (common separator)
         if '\n\n\n' in content:
             parts = content.split('\n\n\n')
             if len(parts) > 1:
-                print("Extracted using triple newline separator")
+                if _DEBUG:
+                    print("Extracted using triple newline separator")
                 return parts[-1].strip()
 
         # Try pattern 3: If content starts with obvious reasoning, take last paragraph
@@ -653,11 +1034,13 @@ IMPORTANT: Provide direct responses without showing your reasoning process or ex
         if any(phrase in first_line for phrase in ['we need', 'let me', 'i need', 'first,']):
             paragraphs = content.split('\n\n')
             if len(paragraphs) > 1:
-                print("Extracted last paragraph (detected reasoning in first line)")
+                if _DEBUG:
+                    print("Extracted last paragraph (detected reasoning in first line)")
                 return paragraphs[-1].strip()
 
         # Default: return as-is
-        print("No reasoning pattern detected, returning original")
+        if _DEBUG:
+            print("No reasoning pattern detected, returning original")
         return content
 
     def generate_daily_greeting(
@@ -692,25 +1075,31 @@ Keep it brief (2-3 sentences), warm, and encouraging. Do NOT explain your reason
             {"role": "user", "content": prompt}
         ]
 
-        response = self.llm.create_chat_completion(
-            messages=messages,
-            max_tokens=512,  # Increased from 150 to allow fuller greetings
-            temperature=0.8
-        )
+        with self._generate_lock:
+            response = self.llm.create_chat_completion(
+                messages=messages,
+                max_tokens=512,  # Increased from 150 to allow fuller greetings
+                temperature=0.8,
+                stop=["</output>"] if self.is_thinking_model else None
+            )
 
         content = response["choices"][0]["message"]["content"]
 
         # Clean up reasoning model output
-        return self._clean_reasoning_output(content)
+        return self._postprocess(content)
 
 
 # Singleton instance
 _qwen_instance: Optional[QwenInterface] = None
+_qwen_lock = threading.Lock()
 
 
 def get_qwen_interface() -> QwenInterface:
-    """Get or create the Qwen interface singleton"""
+    """Get or create the Qwen interface singleton (double-checked lock -
+    two concurrent first requests must not each load a multi-GB model)"""
     global _qwen_instance
     if _qwen_instance is None:
-        _qwen_instance = QwenInterface()
+        with _qwen_lock:
+            if _qwen_instance is None:
+                _qwen_instance = QwenInterface()
     return _qwen_instance
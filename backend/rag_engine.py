@@ -3,23 +3,140 @@ RAG (Retrieval-Augmented Generation) engine for DiaryML
 Uses ChromaDB for vector storage and semantic search
 """
 
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
 import chromadb
 from chromadb.config import Settings
+from functools import lru_cache
 from sentence_transformers import SentenceTransformer
 
 
+def _best_device() -> str:
+    """Pick the fastest available device for the embedding model"""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+        if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+            return "mps"
+    except ImportError:
+        pass
+    return "cpu"
+
+
+# Emotion vocabulary whose "feeling <emotion>" queries get precomputed
+EMOTIONS = (
+    "joy", "sadness", "anger", "fear", "love", "surprise",
+    "calm", "excitement", "melancholy", "peaceful"
+)
+
+# One PersistentClient per path, shared across engines and threads
+_clients: Dict[str, chromadb.PersistentClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(persist_directory: Path) -> chromadb.PersistentClient:
+    """Get or create the shared Chroma client for a persist path"""
+    key = str(persist_directory)
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = chromadb.PersistentClient(
+                path=key,
+                settings=Settings(
+                    anonymized_telemetry=False,
+                    allow_reset=True
+                )
+            )
+    return client
+
+
+@lru_cache(maxsize=1)
+def _get_embedding_model() -> SentenceTransformer:
+    """Load the shared sentence-transformer once per process, on first use"""
+    print("Loading embedding model...")
+
+    # On CPU the MiniLM forward pass is bandwidth-bound; the ONNX backend
+    # (int8-quantized export when published) roughly doubles throughput at
+    # <1% recall loss. Unsupported setups fall back to the torch backend.
+    if _best_device() == "cpu":
+        for file_name in ("model_qint8_avx512_vnni.onnx", None):
+            try:
+                model_kwargs = {"file_name": file_name} if file_name else {}
+                model = SentenceTransformer(
+                    'all-MiniLM-L6-v2',
+                    backend="onnx",
+                    model_kwargs=model_kwargs
+                )
+                print("✓ Using ONNX embedding backend"
+                      + (" (int8)" if file_name else ""))
+                return model
+            except Exception:
+                continue
+
+    return SentenceTransformer('all-MiniLM-L6-v2', device=_best_device())
+
+
+class _EmbeddingCache:
+    """Thread-safe LRU cache with TTL for query embeddings"""
+
+    def __init__(self, max_size: int = 2000, ttl_seconds: float = 600.0):
+        self._data: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: bytes) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            stored_at, value = item
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: bytes, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
 class RAGEngine:
     """RAG engine for semantic search over journal entries"""
 
-    def __init__(self, persist_directory: Optional[Path] = None):
+    def __init__(
+        self,
+        persist_directory: Optional[Path] = None,
+        batch_size: int = 64,
+        hnsw_m: int = 16,
+        hnsw_construction_ef: int = 200,
+        hnsw_search_ef: int = 50
+    ):
         """
         Initialize RAG engine
 
         Args:
             persist_directory: Directory to persist ChromaDB data
+            batch_size: Embedding batch size for bulk operations
+            hnsw_m: HNSW graph degree (recall/memory tradeoff)
+            hnsw_construction_ef: Build-time candidate list size
+            hnsw_search_ef: Query-time candidate list size
         """
         global _rag_init_logged
 
@@ -33,28 +150,64 @@ class RAGEngine:
             print("Initializing RAG engine...")
             _rag_init_logged = True
 
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=str(persist_directory),
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
-        )
+        # Initialize ChromaDB (one shared client per persist path - each
+        # client carries its own thread pool, file handles and HNSW arenas)
+        self.client = _get_client(persist_directory)
+
+        # HNSW knobs are the main recall-vs-latency lever for graph ANN.
+        # Embeddings are unit-normalized, so inner product == cosine but
+        # skips the division inside HNSW's distance kernel.
+        self._collection_metadata = {
+            "hnsw:space": "ip",
+            "hnsw:M": hnsw_m,
+            "hnsw:construction_ef": hnsw_construction_ef,
+            "hnsw:search_ef": hnsw_search_ef,
+            "hnsw:num_threads": os.cpu_count() or 4
+        }
 
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
             name="diary_entries",
-            metadata={"hnsw:space": "cosine"}  # Use cosine similarity
+            metadata=self._collection_metadata
         )
 
-        # Initialize embedding model (lightweight and fast)
-        if not _rag_init_logged or _rag_engine is None:  # Only log on first init
-            print("Loading embedding model...")
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Collections created before the ip switch keep their cosine space;
+        # normalized vectors rank identically under both
+        existing_space = (self.collection.metadata or {}).get("hnsw:space")
+        if existing_space and existing_space != self._collection_metadata["hnsw:space"]:
+            self._collection_metadata["hnsw:space"] = existing_space
+
+        # The embedding model itself is process-wide and lazy - see the
+        # embedding_model property
+        self.batch_size = batch_size
+
+        # Query embeddings repeat constantly (canned emotion queries,
+        # re-renders of the same entry) - cache the forward passes.
+        # _generation bumps on every write so result-level caches can
+        # invalidate without clearing embeddings (still valid per text).
+        self._embedding_cache = _EmbeddingCache()
+
+        # Full search results keyed by (query, n_results, filter, write
+        # generation) - hits skip both the encode and the HNSW traversal
+        self._result_cache = _EmbeddingCache(max_size=500)
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._generation = 0
+
+        # Content hashes let update_entry skip re-embedding unchanged text
+        self._content_hashes: Dict[str, bytes] = {}
+
+        # "feeling <emotion>" embeddings, built on first emotion search so
+        # the model load stays lazy
+        self._emotion_embeddings: Optional[Dict[str, Any]] = None
         if not _rag_init_logged or _rag_engine is None:
             print("✓ RAG engine initialized")
 
+    @property
+    def embedding_model(self) -> SentenceTransformer:
+        """Shared lazily-loaded embedding model (one copy per process)"""
+        return _get_embedding_model()
+
     def add_entry(
         self,
         entry_id: int,
@@ -71,31 +224,142 @@ class RAGEngine:
             timestamp: Entry timestamp
             metadata: Additional metadata (moods, projects, etc.)
         """
-        # Generate embedding
-        embedding = self.embedding_model.encode(content).tolist()
+        self.add_entries([{
+            "entry_id": entry_id,
+            "content": content,
+            "timestamp": timestamp,
+            "metadata": metadata
+        }])
+
+    def add_entries(self, entries: List[Dict[str, Any]]):
+        """
+        Add several diary entries with one batched embedding pass
+
+        One encode() call amortizes tokenizer and kernel-launch overhead
+        across all texts, and one collection.add takes the HNSW write lock
+        once instead of once per entry.
+
+        Args:
+            entries: Dicts with entry_id, content, timestamp and optional
+                     metadata keys (same shapes add_entry accepts)
+        """
+        if not entries:
+            return
+
+        # Keep the (N, 384) float32 matrix - .tolist() would box every
+        # component into a Python float just for Chroma to re-pack it
+        embeddings = self.embedding_model.encode(
+            [entry["content"] for entry in entries],
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        ).astype(np.float32, copy=False)
+
+        metadatas = [
+            self._build_metadata(entry["content"], entry["timestamp"], entry.get("metadata"))
+            for entry in entries
+        ]
+
+        self.collection.add(
+            embeddings=embeddings,
+            documents=[entry["content"] for entry in entries],
+            ids=[str(entry["entry_id"]) for entry in entries],
+            metadatas=metadatas
+        )
+
+        for entry in entries:
+            self._content_hashes[str(entry["entry_id"])] = hashlib.sha256(
+                entry["content"].encode()
+            ).digest()
+
+        self._generation += 1
+
+    def bulk_import(self, entries: List[Dict[str, Any]], chunk_rows: int = 1000):
+        """
+        Ingest a large backfill (e.g. import from another journaling tool)
+
+        All texts are embedded in one large-batch pass; inserts go to
+        Chroma in bounded chunks so HNSW's parallel build gets sizable
+        slices without one huge GIL-held call.
+
+        Args:
+            entries: Same dict shape as add_entries
+            chunk_rows: Rows per collection.add call
+        """
+        if not entries:
+            return
+
+        # Let hnswlib parallelize graph construction across cores
+        os.environ.setdefault("CHROMA_HNSW_NUM_THREADS", str(os.cpu_count() or 4))
+
+        embeddings = self.embedding_model.encode(
+            [entry["content"] for entry in entries],
+            batch_size=128,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        ).astype(np.float32, copy=False)
+
+        total = len(entries)
+        for start in range(0, total, chunk_rows):
+            chunk = entries[start:start + chunk_rows]
+            self.collection.add(
+                embeddings=embeddings[start:start + chunk_rows],
+                documents=[entry["content"] for entry in chunk],
+                ids=[str(entry["entry_id"]) for entry in chunk],
+                metadatas=[
+                    self._build_metadata(entry["content"], entry["timestamp"], entry.get("metadata"))
+                    for entry in chunk
+                ]
+            )
+            print(f"  Imported {min(start + chunk_rows, total)}/{total} entries")
+
+        for entry in entries:
+            self._content_hashes[str(entry["entry_id"])] = hashlib.sha256(
+                entry["content"].encode()
+            ).digest()
 
-        # Prepare metadata
+        self._generation += 1
+
+    @staticmethod
+    def _build_metadata(
+        content: str,
+        timestamp: datetime,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Assemble the stored metadata for one entry"""
         meta = {
             "timestamp": timestamp.isoformat(),
+            # Numeric twin of the ISO timestamp so date-range filters
+            # run server-side in Chroma's where clause
+            "ts_epoch": int(timestamp.timestamp()),
             "length": len(content)
         }
 
         if metadata:
             meta.update(metadata)
 
-        # Add to ChromaDB
-        self.collection.add(
-            embeddings=[embedding],
-            documents=[content],
-            ids=[str(entry_id)],
-            metadatas=[meta]
-        )
+        return meta
+
+    def _encode_cached(self, text: str):
+        """Encode a query, serving repeats from the embedding cache"""
+        key = hashlib.sha256(text.encode()).digest()
+        embedding = self._embedding_cache.get(key)
+
+        if embedding is None:
+            embedding = self.embedding_model.encode(
+                text, normalize_embeddings=True, convert_to_numpy=True
+            ).astype(np.float32, copy=False)
+            self._embedding_cache.put(key, embedding)
+
+        return embedding
 
     def search_entries(
         self,
         query: str,
         n_results: int = 5,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        ef_search: Optional[int] = None,
+        include: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Semantic search for relevant entries
@@ -104,63 +368,185 @@ class RAGEngine:
             query: Search query or current entry text
             n_results: Number of results to return
             filter_metadata: Optional filters (e.g., date range, emotions)
+            ef_search: Widen/narrow the HNSW candidate list for this and
+                       subsequent queries (recall vs latency)
+            include: Chroma fields to ship back (narrow to ["documents"]
+                     for hot paths that only need text)
 
         Returns:
             List of relevant entries with metadata
         """
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode(query).tolist()
+        if ef_search is not None and ef_search != self._collection_metadata["hnsw:search_ef"]:
+            self.collection.modify(metadata={"hnsw:search_ef": ef_search})
+            self._collection_metadata["hnsw:search_ef"] = ef_search
+        # Serve repeated searches straight from the result cache (keyed by
+        # the write generation, so any add/update/delete bypasses it)
+        filter_key = json.dumps(filter_metadata, sort_keys=True) if filter_metadata else ""
+        current_ef = self._collection_metadata["hnsw:search_ef"]
+        include_key = ",".join(include) if include else "*"
+        cache_key = hashlib.sha256(
+            f"{n_results}:{current_ef}:{self._generation}:{include_key}:{filter_key}:{query}".encode()
+        ).digest()
+
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            self._cache_hits += 1
+            return [dict(entry) for entry in cached]
+        self._cache_misses += 1
+
+        # Generate query embedding (cached for repeated queries; the raw
+        # ndarray goes straight to Chroma)
+        query_embedding = self._encode_cached(query)
 
         # Search
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            where=filter_metadata if filter_metadata else None
-        )
+        query_kwargs = {
+            "query_embeddings": [query_embedding],
+            "n_results": n_results,
+            "where": filter_metadata if filter_metadata else None
+        }
+        if include is not None:
+            query_kwargs["include"] = include
+
+        results = self.collection.query(**query_kwargs)
 
-        # Format results
+        entries = self._format_query_results(results, 0)
+
+        self._result_cache.put(cache_key, [dict(entry) for entry in entries])
+
+        return entries
+
+    @staticmethod
+    def _format_query_results(results, index: int) -> List[Dict[str, Any]]:
+        """Format one query's slice of a Chroma result set (fields not
+        requested via include come back as None and default here)"""
         entries = []
         if results and results['documents']:
-            for i, doc in enumerate(results['documents'][0]):
+            distances = results.get('distances')
+            metadatas = results.get('metadatas')
+
+            for i, doc in enumerate(results['documents'][index]):
                 entry = {
-                    "id": int(results['ids'][0][i]),
+                    "id": int(results['ids'][index][i]),
                     "content": doc,
-                    "distance": results['distances'][0][i] if 'distances' in results else None,
-                    "metadata": results['metadatas'][0][i] if results['metadatas'] else {}
+                    "distance": distances[index][i] if distances else None,
+                    "metadata": metadatas[index][i] if metadatas else {}
                 }
                 entries.append(entry)
 
         return entries
 
+    def batch_search(self, queries: List[str], n_results: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Run several semantic queries with one encode and one Chroma call
+
+        Args:
+            queries: Search queries
+            n_results: Number of results per query
+
+        Returns:
+            One result list per query, in order
+        """
+        if not queries:
+            return []
+
+        embeddings = self.embedding_model.encode(
+            queries,
+            batch_size=min(len(queries), 32),
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        ).astype(np.float32, copy=False)
+
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=n_results
+        )
+
+        return [self._format_query_results(results, i) for i in range(len(queries))]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get search-result cache statistics"""
+        total = self._cache_hits + self._cache_misses
+
+        return {
+            "hits": self._cache_hits,
+            "misses": self._cache_misses,
+            "hit_rate": self._cache_hits / total if total else 0.0
+        }
+
     def get_contextual_entries(
         self,
         current_entry: str,
         exclude_id: Optional[int] = None,
-        n_results: int = 3
+        n_results: int = 3,
+        mmr_lambda: float = 0.7
     ) -> List[str]:
         """
-        Get contextually relevant past entries for RAG
+        Get contextually relevant, diverse past entries for RAG
+
+        Candidates come from a wider ANN pool and are reranked with
+        maximal marginal relevance so near-duplicate diary entries don't
+        crowd out the context window.
 
         Args:
             current_entry: Current entry text
             exclude_id: Entry ID to exclude (typically the current entry)
             n_results: Number of context entries to retrieve
+            mmr_lambda: Relevance/diversity tradeoff (1.0 = pure relevance)
 
         Returns:
             List of relevant entry texts
         """
-        results = self.search_entries(current_entry, n_results=n_results + 1)
+        query_embedding = self._encode_cached(current_entry)
+
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=max(n_results + 1, 4 * n_results),
+            include=["documents", "embeddings"]
+        )
+
+        if not results or not results['documents'] or not results['documents'][0]:
+            return []
+
+        documents = results['documents'][0]
+        ids = results['ids'][0]
+        embeddings = np.asarray(results['embeddings'][0], dtype=np.float32)
+
+        # Drop the excluded entry from the candidate pool
+        keep = [
+            i for i, entry_id in enumerate(ids)
+            if exclude_id is None or int(entry_id) != exclude_id
+        ]
+        if not keep:
+            return []
+
+        documents = [documents[i] for i in keep]
+        embeddings = embeddings[keep]
+
+        # Unit-normalize defensively (pre-ip vectors may not be normalized)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.where(norms == 0, 1, norms)
+        query_norm = np.linalg.norm(query_embedding)
+        query_unit = query_embedding / (query_norm if query_norm else 1)
+
+        # All pairwise similarities once; the greedy loop is pure vector math
+        relevance = embeddings @ query_unit
+        pairwise = embeddings @ embeddings.T
+
+        selected: List[int] = []
+        max_sim_to_selected = np.full(len(documents), -np.inf, dtype=np.float32)
 
-        # Filter out the excluded entry
-        relevant_entries = []
-        for result in results:
-            if exclude_id is None or result["id"] != exclude_id:
-                relevant_entries.append(result["content"])
+        for _ in range(min(n_results, len(documents))):
+            if selected:
+                scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_sim_to_selected
+            else:
+                scores = relevance.copy()
+            scores[selected] = -np.inf
 
-            if len(relevant_entries) >= n_results:
-                break
+            pick = int(np.argmax(scores))
+            selected.append(pick)
+            max_sim_to_selected = np.maximum(max_sim_to_selected, pairwise[:, pick])
 
-        return relevant_entries
+        return [documents[i] for i in selected]
 
     def search_by_emotion(
         self,
@@ -177,9 +563,51 @@ class RAGEngine:
         Returns:
             List of entries with similar emotions
         """
-        # Use emotion as query
-        query = f"feeling {emotion}"
-        return self.search_entries(query, n_results=n_results)
+        # Known emotions use a precomputed query embedding - no transformer
+        # forward pass at all
+        embedding = self._get_emotion_embedding(emotion)
+        if embedding is None:
+            return self.search_entries(f"feeling {emotion}", n_results=n_results)
+
+        results = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=n_results
+        )
+        return self._format_query_results(results, 0)
+
+    def _get_emotion_embedding(self, emotion: str):
+        """Get the precomputed embedding for a known emotion, if any"""
+        if self._emotion_embeddings is None:
+            vectors = self.embedding_model.encode(
+                [f"feeling {e}" for e in EMOTIONS],
+                normalize_embeddings=True,
+                convert_to_numpy=True
+            ).astype(np.float32, copy=False)
+            self._emotion_embeddings = dict(zip(EMOTIONS, vectors))
+
+        return self._emotion_embeddings.get(emotion)
+
+    def search_by_emotions(
+        self,
+        emotions: List[str],
+        n_results: int = 10
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Find entries for several emotions in one batched query
+
+        Args:
+            emotions: Emotions to search for
+            n_results: Number of results per emotion
+
+        Returns:
+            Mapping of emotion -> matching entries
+        """
+        results = self.batch_search(
+            [f"feeling {emotion}" for emotion in emotions],
+            n_results=n_results
+        )
+
+        return dict(zip(emotions, results))
 
     def search_by_timeframe(
         self,
@@ -200,26 +628,33 @@ class RAGEngine:
         Returns:
             List of entries in timeframe
         """
-        # Note: ChromaDB filtering by date range requires metadata filters
-        # This is a simplified version - might need adjustment based on ChromaDB version
+        # Push the date predicate into Chroma via the numeric ts_epoch
+        # metadata - no over-fetching and Python-side timestamp parsing.
+        # (Entries indexed before ts_epoch existed need a re-index to match.)
+        where = {"$and": [
+            {"ts_epoch": {"$gte": int(start_date.timestamp())}},
+            {"ts_epoch": {"$lte": int(end_date.timestamp())}}
+        ]}
 
         if query:
-            results = self.search_entries(query, n_results=n_results * 2)
-            # Filter by date in post-processing
-            filtered = []
-            for result in results:
-                timestamp_str = result.get("metadata", {}).get("timestamp")
-                if timestamp_str:
-                    entry_date = datetime.fromisoformat(timestamp_str)
-                    if start_date <= entry_date <= end_date:
-                        filtered.append(result)
-                        if len(filtered) >= n_results:
-                            break
-            return filtered
-        else:
-            # Get all and filter
-            # For production, implement proper date filtering
-            return []
+            return self.search_entries(query, n_results=n_results, filter_metadata=where)
+
+        # No query - plain metadata-filtered fetch
+        results = self.collection.get(
+            where=where,
+            limit=n_results,
+            include=["documents", "metadatas"]
+        )
+
+        return [
+            {
+                "id": int(results["ids"][i]),
+                "content": doc,
+                "distance": None,
+                "metadata": results["metadatas"][i] if results["metadatas"] else {}
+            }
+            for i, doc in enumerate(results["documents"])
+        ]
 
     def update_entry(
         self,
@@ -229,21 +664,45 @@ class RAGEngine:
         metadata: Optional[Dict[str, Any]] = None
     ):
         """Update an existing entry in the vector database"""
-        # Delete old version
-        try:
-            self.collection.delete(ids=[str(entry_id)])
-        except:
-            pass
+        entry_key = str(entry_id)
+        content_hash = hashlib.sha256(content.encode()).digest()
+        meta = self._build_metadata(content, timestamp, metadata)
+
+        # Unchanged text keeps its embedding - only refresh the metadata
+        if self._content_hashes.get(entry_key) == content_hash:
+            self.collection.update(ids=[entry_key], metadatas=[meta])
+            self._generation += 1
+            return
+
+        embedding = self.embedding_model.encode(
+            content, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32, copy=False)
+
+        # upsert mutates the graph once and leaves no window where the
+        # entry is absent (the old delete-then-add did both)
+        self.collection.upsert(
+            ids=[entry_key],
+            embeddings=[embedding],
+            documents=[content],
+            metadatas=[meta]
+        )
 
-        # Add updated version
-        self.add_entry(entry_id, content, timestamp, metadata)
+        self._content_hashes[entry_key] = content_hash
+        self._generation += 1
 
     def delete_entry(self, entry_id: int):
         """Delete entry from vector database"""
-        try:
-            self.collection.delete(ids=[str(entry_id)])
-        except:
-            pass
+        entry_key = str(entry_id)
+
+        # Cheap id-only lookup instead of swallowing exceptions on misses
+        # (and real Chroma errors now surface instead of vanishing)
+        existing = self.collection.get(ids=[entry_key], include=[])
+        if not existing["ids"]:
+            return
+
+        self.collection.delete(ids=[entry_key])
+        self._content_hashes.pop(entry_key, None)
+        self._generation += 1
 
     def get_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
@@ -259,8 +718,9 @@ class RAGEngine:
         self.client.delete_collection("diary_entries")
         self.collection = self.client.create_collection(
             name="diary_entries",
-            metadata={"hnsw:space": "cosine"}
+            metadata=self._collection_metadata
         )
+        self._generation += 1
 
 
 # Singleton
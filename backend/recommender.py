@@ -5,9 +5,44 @@ Suggests activities, projects, and media based on patterns and mood
 
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from collections import Counter
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import os
 import random
 
+# Overlaps the media-history DB fetch with the pure-Python suggestion work
+_executor = ThreadPoolExecutor(max_workers=2)
+
+# Sentiments treated as "liked it" when mining media history
+_POSITIVE_SENTIMENTS = ("positive", "love", None)
+
+
+def _make_picker():
+    """
+    Build a picker backed by one urandom draw
+
+    A single 16-byte read funds every random pick in a suggestion
+    request, instead of a Mersenne-twister state read per choice.
+    """
+    entropy = iter(os.urandom(16))
+
+    def pick(seq):
+        return seq[next(entropy) % len(seq)]
+
+    return pick
+
+# Dominant emotion -> suggestion category, as O(1) lookups instead of
+# if/elif chains repeated in every helper
+_GREETING_CATEGORY = {
+    "joy": "joy", "love": "joy", "excitement": "joy",
+    "sadness": "sadness", "melancholy": "sadness", "fear": "sadness",
+    "calm": "calm", "peaceful": "calm",
+}
+_MEDIA_CATEGORY = {
+    "joy": "joy", "love": "joy",
+    "sadness": "sadness", "fear": "sadness",
+}
+
 
 class Recommender:
     """Generate personalized recommendations"""
@@ -35,17 +70,36 @@ class Recommender:
         Returns:
             Dict with categorized suggestions
         """
+        # One scan yields both the dominant emotion and its intensity;
+        # every helper shares them. All random picks share one entropy draw.
+        if mood_state:
+            dominant, intensity = max(mood_state.items(), key=lambda kv: kv[1])
+        else:
+            dominant, intensity = None, 0.0
+        pick = _make_picker()
+
+        # Kick off the only I/O-bound piece - the media history query -
+        # while the pure-Python suggestions compute
+        media_future = _executor.submit(db.get_media_history, limit=100)
+
         suggestions = {
-            "greeting": self._generate_greeting(mood_state),
+            "greeting": self._generate_greeting(mood_state, dominant, pick),
             "projects": self._suggest_projects(active_projects),
-            "creative": self._suggest_creative_activities(mood_state),
-            "media": self._suggest_media(db, mood_state),
-            "wellness": self._suggest_wellness(mood_state)
+            "creative": self._suggest_creative_activities(mood_state, pick, dominant, intensity),
+            "wellness": self._suggest_wellness(mood_state, pick, intensity)
         }
+        suggestions["media"] = self._suggest_media(
+            media_future.result(), mood_state, dominant, pick
+        )
 
         return suggestions
 
-    def _generate_greeting(self, mood_state: Dict[str, float]) -> str:
+    def _generate_greeting(
+        self,
+        mood_state: Dict[str, float],
+        dominant_emotion: Optional[str] = None,
+        pick=None
+    ) -> str:
         """Generate personalized morning greeting"""
         greetings = {
             "joy": [
@@ -71,21 +125,13 @@ class Recommender:
         }
 
         # Determine dominant mood category
-        if not mood_state:
-            mood_category = "neutral"
-        else:
-            dominant_emotion = max(mood_state.items(), key=lambda x: x[1])[0]
-
-            if dominant_emotion in ["joy", "love", "excitement"]:
-                mood_category = "joy"
-            elif dominant_emotion in ["sadness", "melancholy", "fear"]:
-                mood_category = "sadness"
-            elif dominant_emotion in ["calm", "peaceful"]:
-                mood_category = "calm"
-            else:
-                mood_category = "neutral"
+        if dominant_emotion is None and mood_state:
+            dominant_emotion = max(mood_state, key=mood_state.get)
+
+        mood_category = _GREETING_CATEGORY.get(dominant_emotion, "neutral")
 
-        return random.choice(greetings.get(mood_category, greetings["neutral"]))
+        pick = pick or random.choice
+        return pick(greetings.get(mood_category, greetings["neutral"]))
 
     def _suggest_projects(self, active_projects: List[str]) -> List[str]:
         """Suggest project-related actions"""
@@ -109,7 +155,13 @@ class Recommender:
 
         return suggestions[:3]
 
-    def _suggest_creative_activities(self, mood_state: Dict[str, float]) -> List[str]:
+    def _suggest_creative_activities(
+        self,
+        mood_state: Dict[str, float],
+        pick=None,
+        dominant: Optional[str] = None,
+        intensity: Optional[float] = None
+    ) -> List[str]:
         """Suggest creative activities based on mood"""
         activities = {
             "high_energy": [
@@ -138,8 +190,8 @@ class Recommender:
         if not mood_state:
             category = "calm"
         else:
-            intensity = max(mood_state.values())
-            dominant = max(mood_state.items(), key=lambda x: x[1])[0]
+            if intensity is None or dominant is None:
+                dominant, intensity = max(mood_state.items(), key=lambda kv: kv[1])
 
             if intensity > 0.7:
                 if dominant in ["sadness", "anger", "fear"]:
@@ -151,66 +203,76 @@ class Recommender:
             else:
                 category = "calm"
 
-        return random.sample(activities[category], min(2, len(activities[category])))
+        pool = activities[category]
+        if pick is None:
+            return random.sample(pool, min(2, len(pool)))
 
-    def _suggest_media(self, db, mood_state: Dict[str, float]) -> List[str]:
-        """Suggest media (movies, books, music) based on history and mood"""
-        # Get media history
-        media_history = db.get_media_history(limit=100)
+        # Two distinct picks from the shared entropy draw
+        first = pick(pool)
+        remaining = [activity for activity in pool if activity != first]
+        return [first, pick(remaining)] if remaining else [first]
 
+    def _suggest_media(
+        self,
+        media_history: List[Dict[str, Any]],
+        mood_state: Dict[str, float],
+        dominant_emotion: Optional[str] = None,
+        pick=None
+    ) -> List[str]:
+        """Suggest media (movies, books, music) based on history and mood"""
         if not media_history:
-            return self._default_media_suggestions(mood_state)
+            return self._default_media_suggestions(mood_state, dominant_emotion)
 
-        # Analyze preferences
-        media_by_type = {}
+        # Analyze preferences: bucket by type and pre-filter liked items in
+        # one pass instead of re-scanning the history per media type
+        media_by_type = defaultdict(list)
+        positive_by_type = defaultdict(list)
         for item in media_history:
             media_type = item.get("media_type", "movie")
-            if media_type not in media_by_type:
-                media_by_type[media_type] = []
             media_by_type[media_type].append(item)
+            if item.get("sentiment") in _POSITIVE_SENTIMENTS:
+                positive_by_type[media_type].append(item)
 
         suggestions = []
 
         # Movie suggestions
         if "movie" in media_by_type:
-            suggestions.append(self._suggest_similar_media(media_by_type["movie"], mood_state, "movie"))
+            suggestions.append(self._suggest_similar_media(positive_by_type["movie"], "movie", pick))
 
         # Book suggestions
         if "book" in media_by_type:
-            suggestions.append(self._suggest_similar_media(media_by_type["book"], mood_state, "book"))
+            suggestions.append(self._suggest_similar_media(positive_by_type["book"], "book", pick))
 
         # Music suggestions
         if "music" in media_by_type:
-            suggestions.append(self._suggest_similar_media(media_by_type["music"], mood_state, "music"))
+            suggestions.append(self._suggest_similar_media(positive_by_type["music"], "music", pick))
 
         # Fill with defaults if needed
         while len(suggestions) < 2:
-            suggestions.extend(self._default_media_suggestions(mood_state))
+            suggestions.extend(self._default_media_suggestions(mood_state, dominant_emotion))
 
         return suggestions[:3]
 
     def _suggest_similar_media(
         self,
-        media_history: List[Dict],
-        mood_state: Dict[str, float],
-        media_type: str
+        positive_media: List[Dict],
+        media_type: str,
+        pick=None
     ) -> str:
-        """Suggest similar media based on history"""
-        # Get positively received media
-        positive_media = [
-            m for m in media_history
-            if m.get("sentiment") in ["positive", "love", None]
-        ]
-
+        """Suggest similar media from the pre-filtered liked history"""
         if positive_media:
             # Pick a recent favorite
             recent = positive_media[:5]
-            favorite = random.choice(recent)
+            favorite = (pick or random.choice)(recent)
             return f"Watch/read/listen to something similar to {favorite.get('title')}"
 
         return f"Explore new {media_type}s that match your current mood"
 
-    def _default_media_suggestions(self, mood_state: Dict[str, float]) -> List[str]:
+    def _default_media_suggestions(
+        self,
+        mood_state: Dict[str, float],
+        dominant_emotion: Optional[str] = None
+    ) -> List[str]:
         """Default media suggestions when no history available"""
         suggestions = {
             "joy": [
@@ -227,17 +289,19 @@ class Recommender:
             ]
         }
 
-        dominant = "neutral"
-        if mood_state:
-            dominant_emotion = max(mood_state.items(), key=lambda x: x[1])[0]
-            if dominant_emotion in ["joy", "love"]:
-                dominant = "joy"
-            elif dominant_emotion in ["sadness", "fear"]:
-                dominant = "sadness"
+        if dominant_emotion is None and mood_state:
+            dominant_emotion = max(mood_state, key=mood_state.get)
+
+        dominant = _MEDIA_CATEGORY.get(dominant_emotion, "neutral")
 
         return suggestions.get(dominant, suggestions["neutral"])
 
-    def _suggest_wellness(self, mood_state: Dict[str, float]) -> List[str]:
+    def _suggest_wellness(
+        self,
+        mood_state: Dict[str, float],
+        pick=None,
+        intensity: Optional[float] = None
+    ) -> List[str]:
         """Suggest wellness activities"""
         wellness = {
             "high_stress": [
@@ -266,7 +330,8 @@ class Recommender:
                 mood_state.get("fear", 0)
             ])
 
-            intensity = max(mood_state.values())
+            if intensity is None:
+                intensity = max(mood_state.values())
 
             if negative_emotions > 0.5 or intensity > 0.8:
                 category = "high_stress"
@@ -275,7 +340,7 @@ class Recommender:
             else:
                 category = "balanced"
 
-        return [random.choice(wellness[category])]
+        return [(pick or random.choice)(wellness[category])]
 
     def suggest_next_project(
         self,
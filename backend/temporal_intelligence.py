@@ -12,11 +12,91 @@ Features:
 
 from typing import Dict, List, Tuple, Any, Optional
 from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from collections import Counter, OrderedDict
+from itertools import groupby
+from operator import itemgetter
+import heapq
 import re
+import threading
+import weakref
 import numpy as np
 from database import DiaryDatabase
 
+# Hot SQL as module constants - identical statement text on every call
+# keeps the connection's statement cache hitting
+_SQL_ENTRIES_WITH_MOOD = """
+    SELECT e.id, e.timestamp, e.content, m.emotion, m.score
+    FROM entries e
+    LEFT JOIN moods m ON m.entry_id = e.id
+    WHERE e.timestamp >= ?
+    ORDER BY e.timestamp DESC
+"""
+_SQL_ALL_PROJECT_ENTRIES = """
+    SELECT DISTINCT p.name, e.id, e.timestamp
+    FROM entries e
+    JOIN project_mentions pm ON e.id = pm.entry_id
+    JOIN projects p ON pm.project_id = p.id
+    WHERE p.status = 'active' AND e.timestamp >= ?
+    ORDER BY p.name, e.timestamp ASC
+"""
+_SQL_PROJECT_ENTRIES = """
+    SELECT DISTINCT e.id, e.timestamp, e.content
+    FROM entries e
+    JOIN project_mentions pm ON e.id = pm.entry_id
+    JOIN projects p ON pm.project_id = p.id
+    WHERE p.name = ? AND e.timestamp >= ?
+    ORDER BY e.timestamp ASC
+"""
+
+# Keyword extraction: one compiled pattern (length filter folded in) and a
+# module-level stop-word set
+_WORD_RE = re.compile(r'\b[a-z]{4,}\b')
+_STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'been', 'be',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those',
+    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'my', 'your', 'his',
+    'her', 'its', 'our', 'their', 'just', 'really', 'very', 'so'
+})
+
+# Shared label tables (module-level so no per-call literals)
+_DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_WEEKEND_DAYS = frozenset({'Saturday', 'Sunday'})
+_POSITIVE_EMOTIONS = frozenset({'joy', 'love', 'surprise'})
+_NEGATIVE_EMOTIONS = frozenset({'sadness', 'anger', 'fear'})
+_POSITIVE_TRIGGER_EMOTIONS = frozenset({'joy', 'love'})
+
+# Hour-of-day -> period index lookup (branchless bucketing)
+_PERIOD_NAMES = ('night', 'morning', 'afternoon', 'evening')
+_HOUR_PERIOD_LUT = np.zeros(24, dtype=np.int8)
+_HOUR_PERIOD_LUT[5:12] = 1   # morning: 5am-12pm
+_HOUR_PERIOD_LUT[12:17] = 2  # afternoon: 12pm-5pm
+_HOUR_PERIOD_LUT[17:22] = 3  # evening: 5pm-10pm
+
+
+class MoodBatch:
+    """
+    Columnar view of a batch of entries for the numeric analyses
+
+    Contiguous arrays instead of one dict (plus a moods dict) per entry -
+    ~30 bytes/entry instead of hundreds, and every analysis consumes the
+    matrices directly.
+    """
+
+    __slots__ = ('ids', 'ts', 'contents', 'scores', 'mask', 'emotions')
+
+    def __init__(self, ids, ts, contents, scores, mask, emotions):
+        self.ids = ids              # (N,) int64 entry ids
+        self.ts = ts                # (N,) datetime64[s]
+        self.contents = contents    # list of N entry texts
+        self.scores = scores        # (N, E) float32 mood scores
+        self.mask = mask            # (N, E) bool presence
+        self.emotions = emotions    # E emotion labels (column order)
+
+    def __len__(self):
+        return len(self.contents)
+
 
 class TemporalIntelligence:
     """Discover patterns and rhythms in your life data"""
@@ -30,6 +110,10 @@ class TemporalIntelligence:
         """
         self.db = db
 
+        # Keyword lists per (entry id, content hash) - the hash keeps the
+        # cache honest when an entry is edited in place under the same id
+        self._kw_cache: "OrderedDict[Tuple[int, int], List[str]]" = OrderedDict()
+
     # ========================================
     # MOOD CYCLE DETECTION
     # ========================================
@@ -43,26 +127,28 @@ class TemporalIntelligence:
         - Time-of-day patterns (e.g., "morning anxiety, evening calm")
         - Seasonal trends
         """
-        entries = self._get_entries_with_mood(days)
+        # One columnar batch: timestamps parsed once, mood matrix built
+        # once, shared by every analysis below
+        batch = self._get_mood_batch(days)
 
-        if len(entries) < 7:
+        if len(batch) < 7:
             return {"status": "insufficient_data", "message": "Need at least 7 days of data"}
 
         # Analyze by day of week
-        day_patterns = self._analyze_day_of_week_patterns(entries)
+        day_patterns = self._analyze_day_of_week_patterns(batch)
 
         # Analyze by time of day
-        time_patterns = self._analyze_time_of_day_patterns(entries)
+        time_patterns = self._analyze_time_of_day_patterns(batch)
 
         # Find most volatile emotions
-        volatile_emotions = self._find_volatile_emotions(entries)
+        volatile_emotions = self._find_volatile_emotions(batch)
 
         # Detect mood streak patterns
-        streak_patterns = self._detect_mood_streaks(entries)
+        streak_patterns = self._detect_mood_streaks(batch)
 
         return {
             "status": "success",
-            "data_points": len(entries),
+            "data_points": len(batch),
             "day_of_week": day_patterns,
             "time_of_day": time_patterns,
             "volatile_emotions": volatile_emotions,
@@ -70,30 +156,81 @@ class TemporalIntelligence:
             "summary": self._generate_mood_cycle_summary(day_patterns, time_patterns, volatile_emotions)
         }
 
-    def _analyze_day_of_week_patterns(self, entries: List[Dict]) -> Dict[str, Any]:
+    def _get_mood_batch(self, days: int) -> MoodBatch:
+        """
+        Fetch recent entries straight into columnar arrays
+
+        The JOIN rows stream into the score/presence matrices without an
+        intermediate dict per entry.
+        """
+        with self.db.get_connection(write=False) as conn:
+            cutoff_date = datetime.now() - timedelta(days=days)
+            rows = conn.execute(_SQL_ENTRIES_WITH_MOOD, (cutoff_date,)).fetchall()
+
+        # Pass 1: entry order and emotion vocabulary
+        ids: List[int] = []
+        timestamps: List[str] = []
+        contents: List[str] = []
+        index_of: Dict[int, int] = {}
+        emotion_set = set()
+
+        for row in rows:
+            if row['id'] not in index_of:
+                index_of[row['id']] = len(ids)
+                ids.append(row['id'])
+                timestamps.append(row['timestamp'])
+                contents.append(row['content'])
+            if row['emotion'] is not None:
+                emotion_set.add(row['emotion'])
+
+        emotions = sorted(emotion_set)
+        emotion_idx = {emotion: j for j, emotion in enumerate(emotions)}
+
+        # Pass 2: fill the matrices
+        scores = np.zeros((len(ids), len(emotions)), dtype=np.float32)
+        mask = np.zeros(scores.shape, dtype=bool)
+
+        for row in rows:
+            if row['emotion'] is not None:
+                i = index_of[row['id']]
+                j = emotion_idx[row['emotion']]
+                scores[i, j] = row['score']
+                mask[i, j] = True
+
+        return MoodBatch(
+            ids=np.asarray(ids, dtype=np.int64),
+            ts=np.array(timestamps, dtype='datetime64[s]'),
+            contents=contents,
+            scores=scores,
+            mask=mask,
+            emotions=emotions
+        )
+
+    def _analyze_day_of_week_patterns(self, batch: MoodBatch) -> Dict[str, Any]:
         """Analyze mood by day of week (Monday=0, Sunday=6)"""
-        day_emotions = defaultdict(lambda: defaultdict(list))
+        scores, mask, emotions = batch.scores, batch.mask, batch.emotions
 
-        for entry in entries:
-            timestamp = datetime.fromisoformat(entry['timestamp'])
-            day_of_week = timestamp.weekday()
+        # Weekday from day ordinals (epoch day 0 was a Thursday)
+        day_idx = ((batch.ts.astype('datetime64[D]').view('int64') + 3) % 7).astype(np.int8)
 
-            for emotion, score in entry['moods'].items():
-                day_emotions[day_of_week][emotion].append(score)
+        # Per-day per-emotion sums and counts in two scatter-adds
+        day_sums = np.zeros((7, len(emotions)), dtype=np.float64)
+        day_counts = np.zeros((7, len(emotions)), dtype=np.int64)
+        np.add.at(day_sums, day_idx, scores * mask)
+        np.add.at(day_counts, day_idx, mask)
 
         # Calculate averages
-        day_averages = {}
-        day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-
-        for day_idx in range(7):
-            day_avg = {}
-            for emotion, scores in day_emotions[day_idx].items():
-                if scores:
-                    day_avg[emotion] = np.mean(scores)
-            day_averages[day_names[day_idx]] = day_avg
+        day_averages = {
+            _DAY_NAMES[d]: {
+                emotions[j]: float(day_sums[d, j] / day_counts[d, j])
+                for j in range(len(emotions))
+                if day_counts[d, j]
+            }
+            for d in range(7)
+        }
 
         # Find most positive and negative days
-        best_day, worst_day = self._find_best_worst_days(day_averages, day_names)
+        best_day, worst_day = self._find_best_worst_days(day_averages)
 
         return {
             "averages": day_averages,
@@ -102,38 +239,30 @@ class TemporalIntelligence:
             "insights": self._generate_day_insights(day_averages)
         }
 
-    def _analyze_time_of_day_patterns(self, entries: List[Dict]) -> Dict[str, Any]:
+    def _analyze_time_of_day_patterns(self, batch: MoodBatch) -> Dict[str, Any]:
         """Analyze mood by time of day (morning, afternoon, evening, night)"""
-        time_emotions = {
-            'morning': defaultdict(list),     # 5am-12pm
-            'afternoon': defaultdict(list),   # 12pm-5pm
-            'evening': defaultdict(list),     # 5pm-10pm
-            'night': defaultdict(list)        # 10pm-5am
-        }
+        # Hour-of-day for every entry from the shared datetime64 array,
+        # bucketed branchlessly through the period lookup table
+        hours = (batch.ts - batch.ts.astype('datetime64[D]')).astype('timedelta64[h]').view('int64')
+        period_idx = _HOUR_PERIOD_LUT[hours]
 
-        for entry in entries:
-            timestamp = datetime.fromisoformat(entry['timestamp'])
-            hour = timestamp.hour
-
-            if 5 <= hour < 12:
-                period = 'morning'
-            elif 12 <= hour < 17:
-                period = 'afternoon'
-            elif 17 <= hour < 22:
-                period = 'evening'
-            else:
-                period = 'night'
+        scores, mask, emotions = batch.scores, batch.mask, batch.emotions
 
-            for emotion, score in entry['moods'].items():
-                time_emotions[period][emotion].append(score)
+        # Per-period per-emotion sums and counts in two scatter-adds
+        period_sums = np.zeros((len(_PERIOD_NAMES), len(emotions)), dtype=np.float64)
+        period_counts = np.zeros((len(_PERIOD_NAMES), len(emotions)), dtype=np.int64)
+        np.add.at(period_sums, period_idx, scores * mask)
+        np.add.at(period_counts, period_idx, mask)
 
-        # Calculate averages
+        # Calculate averages (morning first, matching the old dict order)
         time_averages = {}
-        for period, emotions in time_emotions.items():
-            period_avg = {}
-            for emotion, scores in emotions.items():
-                if scores:
-                    period_avg[emotion] = np.mean(scores)
+        for period in ('morning', 'afternoon', 'evening', 'night'):
+            p = _PERIOD_NAMES.index(period)
+            period_avg = {
+                emotions[j]: float(period_sums[p, j] / period_counts[p, j])
+                for j in range(len(emotions))
+                if period_counts[p, j]
+            }
             if period_avg:
                 time_averages[period] = period_avg
 
@@ -142,64 +271,74 @@ class TemporalIntelligence:
             "insights": self._generate_time_insights(time_averages)
         }
 
-    def _find_volatile_emotions(self, entries: List[Dict]) -> List[Dict[str, Any]]:
+    def _find_volatile_emotions(self, batch: MoodBatch) -> List[Dict[str, Any]]:
         """Find emotions with high variance (emotional volatility)"""
-        emotion_scores = defaultdict(list)
-
-        for entry in entries:
-            for emotion, score in entry['moods'].items():
-                emotion_scores[emotion].append(score)
-
-        volatility = []
-        for emotion, scores in emotion_scores.items():
-            if len(scores) >= 5:
-                variance = np.var(scores)
-                mean = np.mean(scores)
-                volatility.append({
-                    "emotion": emotion,
-                    "variance": float(variance),
-                    "mean": float(mean),
-                    "stability": "volatile" if variance > 0.08 else "stable"
-                })
-
-        return sorted(volatility, key=lambda x: -x['variance'])[:3]
-
-    def _detect_mood_streaks(self, entries: List[Dict]) -> Dict[str, Any]:
+        scores, mask, emotions = batch.scores, batch.mask, batch.emotions
+
+        # Column-wise mean and population variance over present scores only
+        counts = mask.sum(axis=0)
+        means = (scores * mask).sum(axis=0) / np.maximum(counts, 1)
+        variances = (((scores - means) ** 2) * mask).sum(axis=0) / np.maximum(counts, 1)
+
+        # Top-3 most volatile among emotions with enough samples
+        valid = np.flatnonzero(counts >= 5)
+        top = valid[np.argsort(-variances[valid], kind='stable')[:3]]
+
+        return [
+            {
+                "emotion": emotions[j],
+                "variance": float(variances[j]),
+                "mean": float(means[j]),
+                "stability": "volatile" if variances[j] > 0.08 else "stable"
+            }
+            for j in top
+        ]
+
+    def _detect_mood_streaks(self, batch: MoodBatch) -> Dict[str, Any]:
         """Detect consecutive days of similar dominant moods"""
-        # Sort entries by timestamp
-        sorted_entries = sorted(entries, key=lambda x: x['timestamp'])
-
+        scores, emotions = batch.scores, batch.emotions
+        ts_arr = batch.ts
+
+        if not emotions:
+            return {
+                "notable_streaks": [],
+                "longest_positive": None,
+                "longest_negative": None
+            }
+
+        # Chronological dominant emotion per entry, keeping only entries
+        # whose dominant score is significant (skipping, like the old loop,
+        # does not break a run)
+        order = np.argsort(ts_arr, kind='stable')
+        dominant = scores.argmax(axis=1)[order]
+        dominant_score = scores.max(axis=1)[order]
+        dates = ts_arr.astype('datetime64[D]').astype(str)[order]
+
+        keep = dominant_score >= 0.3
+        dominant = dominant[keep]
+        dates = dates[keep]
+
+        # Run-length encode: boundaries where the dominant emotion changes
         streaks = []
-        current_streak = None
-
-        for entry in sorted_entries:
-            # Get dominant emotion
-            dominant = max(entry['moods'].items(), key=lambda x: x[1])
-            emotion, score = dominant
-
-            if score < 0.3:  # Only count significant emotions
-                continue
-
-            if current_streak and current_streak['emotion'] == emotion:
-                current_streak['length'] += 1
-                current_streak['end_date'] = entry['timestamp'][:10]
-            else:
-                if current_streak and current_streak['length'] >= 3:
-                    streaks.append(current_streak)
-
-                current_streak = {
-                    "emotion": emotion,
-                    "length": 1,
-                    "start_date": entry['timestamp'][:10],
-                    "end_date": entry['timestamp'][:10]
+        if len(dominant):
+            change = np.concatenate(([True], dominant[1:] != dominant[:-1]))
+            starts = np.flatnonzero(change)
+            ends = np.concatenate((starts[1:], [len(dominant)])) - 1
+            lengths = ends - starts + 1
+
+            streaks = [
+                {
+                    "emotion": emotions[dominant[start]],
+                    "length": int(length),
+                    "start_date": dates[start],
+                    "end_date": dates[end]
                 }
-
-        # Add final streak if long enough
-        if current_streak and current_streak['length'] >= 3:
-            streaks.append(current_streak)
+                for start, end, length in zip(starts, ends, lengths)
+                if length >= 3
+            ]
 
         return {
-            "notable_streaks": sorted(streaks, key=lambda x: -x['length'])[:5],
+            "notable_streaks": heapq.nlargest(5, streaks, key=itemgetter('length')),
             "longest_positive": self._find_longest_positive_streak(streaks),
             "longest_negative": self._find_longest_negative_streak(streaks)
         }
@@ -220,11 +359,18 @@ class TemporalIntelligence:
         if not projects:
             return {"status": "no_projects", "message": "No projects found in entries"}
 
+        # One query for every project's mentions, grouped in a single pass
+        entries_by_project = {
+            name: list(group)
+            for name, group in groupby(
+                self._get_all_project_entries(days), key=lambda row: row['name']
+            )
+        }
+
         momentum_data = []
 
         for project in projects:
-            # Get entries mentioning this project
-            entries = self._get_project_entries(project['name'], days)
+            entries = entries_by_project.get(project['name'])
 
             if not entries:
                 continue
@@ -254,27 +400,34 @@ class TemporalIntelligence:
         if len(entries) < 2:
             return {"status": "insufficient_data", "mention_count": len(entries)}
 
-        # Sort by timestamp
-        sorted_entries = sorted(entries, key=lambda x: x['timestamp'])
+        # One parse pass, one now(); the window counts are boolean masks
+        # over the sorted timestamp vector instead of per-entry _is_recent
+        # calls (each of which re-parsed and re-fetched the clock)
+        timestamps = np.sort(
+            np.array([entry['timestamp'] for entry in entries], dtype='datetime64[s]')
+        )
+        now = np.datetime64(datetime.now())
 
-        first_mention = datetime.fromisoformat(sorted_entries[0]['timestamp'])
-        last_mention = datetime.fromisoformat(sorted_entries[-1]['timestamp'])
-        days_active = (last_mention - first_mention).days or 1
+        first_mention = timestamps[0]
+        last_mention = timestamps[-1]
+        days_active = int((last_mention - first_mention) / np.timedelta64(1, 'D')) or 1
 
         # Calculate mention frequency in different time windows
-        recent_mentions = len([e for e in sorted_entries if self._is_recent(e['timestamp'], 14)])
-        older_mentions = len([e for e in sorted_entries if not self._is_recent(e['timestamp'], 14) and self._is_recent(e['timestamp'], days_active)])
+        recent_mask = timestamps >= now - np.timedelta64(14, 'D')
+        recent_mentions = int(recent_mask.sum())
+        older_mentions = int(
+            (~recent_mask & (timestamps >= now - np.timedelta64(days_active, 'D'))).sum()
+        )
+
+        days_since_last = int((now - last_mention) / np.timedelta64(1, 'D'))
 
         # Determine status
         if days_active > 10 and recent_mentions == 0:
             status = "stalled"
-            days_since_last = (datetime.now() - last_mention).days
         elif recent_mentions > older_mentions:
             status = "accelerating"
-            days_since_last = (datetime.now() - last_mention).days
         else:
             status = "consistent"
-            days_since_last = (datetime.now() - last_mention).days
 
         return {
             "status": status,
@@ -300,29 +453,68 @@ class TemporalIntelligence:
         if len(entries) < 10:
             return {"status": "insufficient_data"}
 
-        # Extract keywords from entries
-        keyword_emotion_pairs = []
+        # Integer-encode keywords and emotions, then reduce co-occurrences
+        # into two dense (K, E) arrays - vocabulary-sized, fits in cache,
+        # and the correlation math becomes elementwise ops
+        kw_to_idx: Dict[str, int] = {}
+        emo_to_idx: Dict[str, int] = {}
+        kw_indices: List[int] = []
+        emo_indices: List[int] = []
+        score_values: List[float] = []
 
         for entry in entries:
-            content = entry['content'].lower()
-            keywords = self._extract_keywords(content)
+            significant_moods = [
+                (emotion, score) for emotion, score in entry['moods'].items()
+                if score > 0.4  # Only significant emotions
+            ]
+            if not significant_moods:
+                continue
+
+            for keyword in self._cached_keywords(entry):
+                ki = kw_to_idx.setdefault(keyword, len(kw_to_idx))
+                for emotion, score in significant_moods:
+                    kw_indices.append(ki)
+                    emo_indices.append(emo_to_idx.setdefault(emotion, len(emo_to_idx)))
+                    score_values.append(score)
+
+        correlations = []
+        if kw_indices:
+            kw_arr = np.asarray(kw_indices, dtype=np.int64)
+            emo_arr = np.asarray(emo_indices, dtype=np.int64)
+
+            counts = np.zeros((len(kw_to_idx), len(emo_to_idx)), dtype=np.int64)
+            sums = np.zeros(counts.shape, dtype=np.float64)
+            np.add.at(counts, (kw_arr, emo_arr), 1)
+            np.add.at(sums, (kw_arr, emo_arr), score_values)
 
-            for emotion, score in entry['moods'].items():
-                if score > 0.4:  # Only significant emotions
-                    for keyword in keywords:
-                        keyword_emotion_pairs.append((keyword, emotion, score))
+            # Minimum 2 co-occurrences; strength is the same weighted score
+            averages = sums / np.maximum(counts, 1)
+            strengths = averages * counts / 10
 
-        # Calculate correlations
-        correlations = self._calculate_keyword_emotion_correlations(keyword_emotion_pairs)
+            keywords_by_idx = list(kw_to_idx)
+            emotions_by_idx = list(emo_to_idx)
+
+            for ki, ei in zip(*np.nonzero(counts >= 2)):
+                correlations.append({
+                    "keyword": keywords_by_idx[ki],
+                    "emotion": emotions_by_idx[ei],
+                    "co_occurrences": int(counts[ki, ei]),
+                    "correlation_strength": float(strengths[ki, ei]),
+                    "avg_emotion_score": float(averages[ki, ei])
+                })
 
         # Find strongest triggers
-        positive_triggers = [c for c in correlations if c['emotion'] in ['joy', 'love']]
-        negative_triggers = [c for c in correlations if c['emotion'] in ['anger', 'sadness', 'fear']]
+        positive_triggers = [c for c in correlations if c['emotion'] in _POSITIVE_TRIGGER_EMOTIONS]
+        negative_triggers = [c for c in correlations if c['emotion'] in _NEGATIVE_EMOTIONS]
 
         return {
             "status": "success",
-            "positive_triggers": sorted(positive_triggers, key=lambda x: -x['correlation_strength'])[:10],
-            "negative_triggers": sorted(negative_triggers, key=lambda x: -x['correlation_strength'])[:10],
+            "positive_triggers": heapq.nlargest(
+                10, positive_triggers, key=itemgetter('correlation_strength')
+            ),
+            "negative_triggers": heapq.nlargest(
+                10, negative_triggers, key=itemgetter('correlation_strength')
+            ),
             "insights": self._generate_trigger_insights(positive_triggers, negative_triggers)
         }
 
@@ -332,53 +524,45 @@ class TemporalIntelligence:
 
     def _get_entries_with_mood(self, days: int) -> List[Dict]:
         """Get recent entries with mood data"""
-        with self.db.get_connection() as conn:
+        with self.db.get_connection(write=False) as conn:
             cutoff_date = datetime.now() - timedelta(days=days)
 
-            entries = conn.execute(
-                """
-                SELECT e.id, e.timestamp, e.content
-                FROM entries e
-                WHERE e.timestamp >= ?
-                ORDER BY e.timestamp DESC
-                """,
-                (cutoff_date,)
-            ).fetchall()
-
-            result = []
-            for entry in entries:
-                moods = conn.execute(
-                    "SELECT emotion, score FROM moods WHERE entry_id = ?",
-                    (entry['id'],)
-                ).fetchall()
-
-                result.append({
-                    "id": entry['id'],
-                    "timestamp": entry['timestamp'],
-                    "content": entry['content'],
-                    "moods": {m['emotion']: m['score'] for m in moods}
-                })
+            # One LEFT JOIN instead of a mood SELECT per entry (N+1)
+            rows = conn.execute(_SQL_ENTRIES_WITH_MOOD, (cutoff_date,)).fetchall()
+
+        result = []
+        entries_by_id = {}
+        for row in rows:
+            entry = entries_by_id.get(row['id'])
+            if entry is None:
+                entry = {
+                    "id": row['id'],
+                    "timestamp": row['timestamp'],
+                    "content": row['content'],
+                    "moods": {}
+                }
+                entries_by_id[row['id']] = entry
+                result.append(entry)
+
+            if row['emotion'] is not None:
+                entry['moods'][row['emotion']] = row['score']
 
-            return result
+        return result
+
+    def _get_all_project_entries(self, days: int) -> List[Dict]:
+        """Get every active project's entries in one query, ordered by name"""
+        with self.db.get_connection(write=False) as conn:
+            cutoff_date = datetime.now() - timedelta(days=days)
+
+            return conn.execute(_SQL_ALL_PROJECT_ENTRIES, (cutoff_date,)).fetchall()
 
     def _get_project_entries(self, project_name: str, days: int) -> List[Dict]:
         """Get entries mentioning a specific project"""
         with self.db.get_connection() as conn:
             cutoff_date = datetime.now() - timedelta(days=days)
 
-            entries = conn.execute(
-                """
-                SELECT DISTINCT e.id, e.timestamp, e.content
-                FROM entries e
-                JOIN project_mentions pm ON e.id = pm.entry_id
-                JOIN projects p ON pm.project_id = p.id
-                WHERE p.name = ? AND e.timestamp >= ?
-                ORDER BY e.timestamp ASC
-                """,
-                (project_name, cutoff_date)
-            ).fetchall()
-
-            return [dict(e) for e in entries]
+            # sqlite3.Row supports ['key'] access - no per-row dict build
+            return conn.execute(_SQL_PROJECT_ENTRIES, (project_name, cutoff_date)).fetchall()
 
     def _is_recent(self, timestamp_str: str, days: int) -> bool:
         """Check if timestamp is within last N days"""
@@ -386,50 +570,30 @@ class TemporalIntelligence:
         cutoff = datetime.now() - timedelta(days=days)
         return timestamp >= cutoff
 
-    def _extract_keywords(self, text: str) -> List[str]:
-        """Extract significant keywords from text"""
-        # Remove common stop words
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-                     'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'been', 'be',
-                     'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-                     'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those',
-                     'i', 'you', 'he', 'she', 'it', 'we', 'they', 'my', 'your', 'his',
-                     'her', 'its', 'our', 'their', 'just', 'really', 'very', 'so'}
-
-        # Extract words
-        words = re.findall(r'\b[a-z]{3,}\b', text)
-
-        # Filter and return significant keywords
-        keywords = [w for w in words if w not in stop_words and len(w) >= 4]
-
-        # Get most common words
-        word_counts = Counter(keywords)
-        return [word for word, count in word_counts.most_common(20)]
+    def _cached_keywords(self, entry: Dict) -> List[str]:
+        """Get an entry's keywords, tokenizing each (id, content) once"""
+        cache_key = (entry['id'], hash(entry['content']))
+        keywords = self._kw_cache.get(cache_key)
 
-    def _calculate_keyword_emotion_correlations(self, pairs: List[Tuple]) -> List[Dict]:
-        """Calculate correlation strength between keywords and emotions"""
-        # Count co-occurrences
-        keyword_emotion_counts = defaultdict(lambda: {'count': 0, 'total_score': 0.0})
+        if keywords is None:
+            keywords = self._extract_keywords(entry['content'].lower())
+            self._kw_cache[cache_key] = keywords
+            while len(self._kw_cache) > 10000:
+                self._kw_cache.popitem(last=False)
+        else:
+            self._kw_cache.move_to_end(cache_key)
 
-        for keyword, emotion, score in pairs:
-            key = (keyword, emotion)
-            keyword_emotion_counts[key]['count'] += 1
-            keyword_emotion_counts[key]['total_score'] += score
+        return keywords
 
-        # Calculate correlations
-        correlations = []
-        for (keyword, emotion), data in keyword_emotion_counts.items():
-            if data['count'] >= 2:  # Minimum 2 occurrences
-                avg_score = data['total_score'] / data['count']
-                correlations.append({
-                    "keyword": keyword,
-                    "emotion": emotion,
-                    "co_occurrences": data['count'],
-                    "correlation_strength": float(avg_score * data['count'] / 10),  # Weighted
-                    "avg_emotion_score": float(avg_score)
-                })
+    def _extract_keywords(self, text: str) -> List[str]:
+        """Extract significant keywords from text"""
+        # One compiled scan with the length filter folded into the pattern;
+        # no intermediate keyword list
+        word_counts = Counter(
+            word for word in _WORD_RE.findall(text) if word not in _STOP_WORDS
+        )
 
-        return correlations
+        return [word for word, count in word_counts.most_common(20)]
 
     # ========================================
     # INSIGHT GENERATION
@@ -452,7 +616,7 @@ class TemporalIntelligence:
 
         return " ".join(insights) if insights else "Not enough data to detect clear patterns yet."
 
-    def _find_best_worst_days(self, day_averages: Dict, day_names: List[str]) -> Tuple[Dict, Dict]:
+    def _find_best_worst_days(self, day_averages: Dict) -> Tuple[Dict, Dict]:
         """Find the best and worst days based on positive/negative emotion balance"""
         day_scores = {}
 
@@ -484,7 +648,7 @@ class TemporalIntelligence:
         for day, emotions in day_averages.items():
             if emotions:
                 score = sum(emotions.values())
-                if day in ['Saturday', 'Sunday']:
+                if day in _WEEKEND_DAYS:
                     weekend_scores.append(score)
                 else:
                     weekday_scores.append(score)
@@ -518,12 +682,12 @@ class TemporalIntelligence:
 
     def _find_longest_positive_streak(self, streaks: List[Dict]) -> Optional[Dict]:
         """Find longest streak of positive emotions"""
-        positive_streaks = [s for s in streaks if s['emotion'] in ['joy', 'love', 'surprise']]
+        positive_streaks = [s for s in streaks if s['emotion'] in _POSITIVE_EMOTIONS]
         return max(positive_streaks, key=lambda x: x['length']) if positive_streaks else None
 
     def _find_longest_negative_streak(self, streaks: List[Dict]) -> Optional[Dict]:
         """Find longest streak of negative emotions"""
-        negative_streaks = [s for s in streaks if s['emotion'] in ['sadness', 'anger', 'fear']]
+        negative_streaks = [s for s in streaks if s['emotion'] in _NEGATIVE_EMOTIONS]
         return max(negative_streaks, key=lambda x: x['length']) if negative_streaks else None
 
     def _generate_momentum_insights(self, stalled: List, accelerating: List) -> List[str]:
@@ -560,13 +724,20 @@ class TemporalIntelligence:
         return insights
 
 
-# Singleton
-_temporal_intelligence: Optional[TemporalIntelligence] = None
+# Singletons, one per database instance, weakly held like the analytics
+# map: dropped instances (and the databases they pin) garbage collect
+# instead of accumulating across unlocks, and the id() key can't be
+# reused while the instance's own db reference keeps its entry alive.
+_temporal_instances: "weakref.WeakValueDictionary[int, TemporalIntelligence]" = weakref.WeakValueDictionary()
+_temporal_lock = threading.Lock()
 
 
 def get_temporal_intelligence(db: DiaryDatabase) -> TemporalIntelligence:
-    """Get or create temporal intelligence singleton"""
-    global _temporal_intelligence
-    if _temporal_intelligence is None:
-        _temporal_intelligence = TemporalIntelligence(db)
-    return _temporal_intelligence
+    """Get or create the temporal intelligence instance for this database"""
+    key = id(db)
+    with _temporal_lock:
+        instance = _temporal_instances.get(key)
+        if instance is None:
+            instance = TemporalIntelligence(db)
+            _temporal_instances[key] = instance
+    return instance
@@ -3,6 +3,7 @@ Test script to verify DiaryML setup
 Run this to check if all components are working
 """
 
+import importlib.util
 import sys
 from pathlib import Path
 
@@ -33,12 +34,13 @@ dependencies = {
     "PIL": "Pillow"
 }
 
+# find_spec only checks presence - importing torch/chromadb here would
+# spend seconds of module init just to answer "is it installed?"
 failed = []
 for module, name in dependencies.items():
-    try:
-        __import__(module)
+    if importlib.util.find_spec(module) is not None:
         print(f"   ✓ {name}")
-    except ImportError:
+    else:
         print(f"   ✗ {name} (not installed)")
         failed.append(name)
 